@@ -21,11 +21,21 @@
 # OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
 # OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
 
-import http.server
-import socketserver
+# Signaling proxy for the web client.
+#
+# Serves the web client and forwards the browser's offers to the robots'
+# port 9991 signaling. Offers are handled concurrently; offers to the
+# same robot are serialised and spaced GO2_MIN_INTERVAL seconds apart,
+# since the robot answers bursts with 429. Timing per robot is exposed as
+# JSON on /metrics.
+
+import asyncio
 import json
 import os
 import sys
+import time
+
+from aiohttp import web
 
 path_to_add = os.path.abspath(os.path.join(os.path.dirname(__file__), "../python"))
 if os.path.exists(path_to_add):
@@ -34,9 +44,19 @@ if os.path.exists(path_to_add):
 else:
     print(f"Path {path_to_add} does not exist")
 
-import go2_webrtc
+from go2_webrtc.go2_connection import Go2Connection, close_session
+from go2_webrtc.latency import LatencyHistogram
+
+PORT = int(os.getenv("PORT", 8081))
+MIN_INTERVAL = float(os.getenv("GO2_MIN_INTERVAL", 1.0))
+STATIC_DIR = os.path.dirname(os.path.abspath(__file__))
+
+CORS_HEADERS = {
+    "Access-Control-Allow-Origin": "*",
+    "Access-Control-Allow-Methods": "POST, OPTIONS",
+    "Access-Control-Allow-Headers": "Content-Type",
+}
 
-PORT = 8081
 
 class SDPDict:
     def __init__(self, existing_dict):
@@ -49,43 +69,118 @@ class SDPDict:
             raise AttributeError(f"No such attribute: {attr}")
 
 
-class CORSRequestHandler(http.server.SimpleHTTPRequestHandler):
-    def do_OPTIONS(self):
-        # Handle CORS preflight request
-        self.send_response(200, "ok")
-        self.send_header("Access-Control-Allow-Origin", "*")
-        self.send_header("Access-Control-Allow-Methods", "POST, OPTIONS")
-        self.send_header("Access-Control-Allow-Headers", "Content-Type")
-        self.end_headers()
-
-    def do_POST(self):
-        if self.path == "/offer":
-            # Read the length of the data
-            content_length = int(self.headers["Content-Length"])
-            # Read the incoming data
-            post_data = self.rfile.read(content_length)
-            # Parse the JSON data
+class RobotLimiter:
+    """One signaling exchange per robot at a time, `interval` seconds apart."""
+
+    def __init__(self, interval):
+        self.interval = interval
+        self.locks = {}
+        self.last = {}
+
+    async def __call__(self, ip, exchange):
+        lock = self.locks.setdefault(ip, asyncio.Lock())
+        async with lock:
+            wait = self.last.get(ip, 0.0) + self.interval - time.monotonic()
+            if wait > 0:
+                await asyncio.sleep(wait)
             try:
-                data = SDPDict(json.loads(post_data))
-            except json.JSONDecodeError:
-                self.send_response(400)
-                self.end_headers()
-                return
+                return await exchange()
+            finally:
+                self.last[ip] = time.monotonic()
 
-            response_data = go2_webrtc.Go2Connection.get_peer_answer(
-                data, data.token, data.ip
-            )
-            self.send_response(200)
-            self.send_header("Content-Type", "application/json")
-            self.send_header("Access-Control-Allow-Origin", "*")
-            self.end_headers()
 
-            self.wfile.write(json.dumps(response_data).encode("utf-8"))
+class RobotMetrics:
+    def __init__(self):
+        self.queued = LatencyHistogram()
+        self.exchange = LatencyHistogram()
+        self.ok = 0
+        self.failed = 0
+        self.in_flight = 0
 
+    def summary(self):
+        return {
+            "ok": self.ok,
+            "failed": self.failed,
+            "in_flight": self.in_flight,
+            "queued": self.queued.summary(),
+            "exchange": self.exchange.summary(),
+        }
 
-# Set up the server
-with socketserver.TCPServer(("", PORT), CORSRequestHandler) as httpd:
-    print(f"Serving on port {PORT}")
-    httpd.serve_forever()
 
+LIMITER = web.AppKey("limiter", RobotLimiter)
+METRICS = web.AppKey("metrics", dict)
+
+
+async def offer(request):
+    try:
+        body = await request.json()
+    except json.JSONDecodeError:
+        return web.Response(status=400, headers=CORS_HEADERS)
+    if not isinstance(body, dict):
+        return web.Response(status=400, headers=CORS_HEADERS)
+    try:
+        data = SDPDict(body)
+        ip, token = data.ip, data.token
+    except AttributeError:
+        return web.Response(status=400, headers=CORS_HEADERS)
+
+    metrics = request.app[METRICS].setdefault(ip, RobotMetrics())
+    metrics.in_flight += 1
+    received = time.perf_counter()
+    started = None
+
+    async def exchange():
+        nonlocal started
+        started = time.perf_counter()
+        metrics.queued.record(started - received)
+        return await Go2Connection.get_peer_answer_async(data, token, ip)
+
+    try:
+        answer = await request.app[LIMITER](ip, exchange)
+    except Exception as e:
+        metrics.failed += 1
+        print(f"Offer for {ip} failed: {e}")
+        return web.json_response({"error": str(e)}, status=502, headers=CORS_HEADERS)
+    finally:
+        metrics.in_flight -= 1
+        if started is not None:
+            metrics.exchange.record(time.perf_counter() - started)
 
+    metrics.ok += 1
+    return web.json_response(answer, headers=CORS_HEADERS)
+
+
+async def options(request):
+    return web.Response(text="ok", headers=CORS_HEADERS)
+
+
+async def metrics(request):
+    return web.json_response(
+        {ip: robot.summary() for ip, robot in request.app[METRICS].items()}
+    )
+
+
+async def index(request):
+    return web.FileResponse(os.path.join(STATIC_DIR, "index.html"))
+
+
+async def on_cleanup(app):
+    await close_session()
+
+
+def make_app():
+    app = web.Application()
+    app[LIMITER] = RobotLimiter(MIN_INTERVAL)
+    app[METRICS] = {}
+    app.router.add_post("/offer", offer)
+    app.router.add_route("OPTIONS", "/offer", options)
+    app.router.add_get("/metrics", metrics)
+    app.router.add_get("/", index)
+    app.router.add_static("/", STATIC_DIR)
+    app.on_cleanup.append(on_cleanup)
+    return app
+
+
+if __name__ == "__main__":
+    print(f"Serving on port {PORT}")
+    web.run_app(make_app(), port=PORT)
@@ -0,0 +1,131 @@
+# Copyright (c) 2024, RoboVerse community
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice, this
+#    list of conditions and the following disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+# Measure JSON encode/decode cost per data channel message type and backend.
+#
+#   python benchmarks/bench_codec.py [--number N]
+
+import argparse
+import os
+import sys
+import timeit
+
+
+PYTHON_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PYTHON_DIR)
+
+from go2_webrtc import codec  # noqa: E402
+
+
+def motor(i):
+    return {
+        "q": 0.1 * i,
+        "dq": 0.0,
+        "ddq": 0.0,
+        "tau_est": 0.25,
+        "temperature": 30 + i,
+        "lost": 0,
+        "reserve": [0, 0],
+    }
+
+
+# Shapes follow the messages seen on the robot's data channel
+MESSAGES = {
+    "lowstate": {
+        "type": "msg",
+        "topic": "rt/lf/lowstate",
+        "data": {
+            "imu_state": {"rpy": [0.01, -0.02, 1.57], "quaternion": [0.7, 0.0, 0.0, 0.7]},
+            "motor_state": [motor(i) for i in range(20)],
+            "bms_state": {"soc": 87, "current": -3200, "cycle": 12},
+            "foot_force": [21, 22, 19, 24],
+            "temperature_ntc1": 41,
+            "power_v": 29.8,
+        },
+    },
+    "sportmodestate": {
+        "type": "msg",
+        "topic": "rt/sportmodestate",
+        "data": {
+            "stamp": {"sec": 1718000000, "nanosec": 123456789},
+            "mode": 1,
+            "progress": 0.0,
+            "gait_type": 1,
+            "position": [0.12, -0.34, 0.31],
+            "velocity": [0.0, 0.0, 0.0],
+            "yaw_speed": 0.0,
+            "range_obstacle": [0.5, 0.6, 0.7, 0.8],
+            "foot_force": [21, 22, 19, 24],
+            "foot_position_body": [0.19, -0.13, -0.3] * 4,
+            "foot_speed_body": [0.0, 0.0, 0.0] * 4,
+        },
+    },
+    "voxel_header": {
+        "type": "msg",
+        "topic": "rt/utlidar/voxel_map_compressed",
+        "data": {
+            "stamp": 1718000000.123,
+            "frame_id": "odom",
+            "resolution": 0.05,
+            "src_size": 80000,
+            "origin": [-3.2, -3.2, -0.6],
+            "width": [128, 128, 30],
+        },
+    },
+    "move": {
+        "type": "msg",
+        "topic": "rt/api/sport/request",
+        "data": {
+            "header": {"identity": {"id": 1718000000123, "api_id": 1008}},
+            "parameter": '{"x": 0.2, "y": 0.0, "z": 0.1}',
+        },
+    },
+}
+
+
+def measure(number):
+    results = []
+    for backend in codec.available():
+        codec.use(backend)
+        for name, message in MESSAGES.items():
+            text = codec.dumps(message)
+            encode = min(timeit.repeat(lambda: codec.dumps(message), number=number, repeat=3))
+            decode = min(timeit.repeat(lambda: codec.loads(text), number=number, repeat=3))
+            results.append((backend, name, len(text), encode / number, decode / number))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--number", type=int, default=2000)
+    args = parser.parse_args()
+
+    for backend, name, size, encode, decode in measure(args.number):
+        print(
+            f"{backend:8s} {name:15s} {size:6d} B  "
+            f"encode {encode * 1e6:8.2f} us  decode {decode * 1e6:8.2f} us"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,232 @@
+# Copyright (c) 2024, RoboVerse community
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice, this
+#    list of conditions and the following disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+# Benchmark lidar voxel map decoding.
+#
+#   python benchmarks/bench_lidar.py [--recording DIR] [--frames N]
+#       [--backend wasm numpy] [--mode mesh points] [--json OUT]
+#       [--baseline OLD.json --max-regression 0.1]
+#
+# Every backend/mode/target combination runs in its own interpreter, so
+# peak RSS is not inflated by earlier cases. The corpus is either the
+# voxel_map_compressed messages of a StreamRecorder directory, or
+# synthetic maps built like real ones. "decode" times LidarDecoder.decode
+# on the payload, "message" times deal_array_buffer on the whole binary
+# message, as Go2Connection.deal_array_buffer does.
+
+import argparse
+import json
+import os
+import resource
+import statistics
+import struct
+import subprocess
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+
+PYTHON_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PYTHON_DIR)
+
+from go2_webrtc.lidar_decoder import LidarDecoder, deal_array_buffer  # noqa: E402
+from go2_webrtc.lidar_numpy import lz4_block_compress  # noqa: E402
+from go2_webrtc.voxel_map import VOXEL_MAP_TOPIC  # noqa: E402
+
+
+TARGETS = ["decode", "message"]
+# Frames traced with tracemalloc, which is too slow for the timed loop
+TRACED_FRAMES = 20
+
+
+def synthetic_message(seed, layers=30):
+    rng = np.random.default_rng(seed)
+    grid = np.zeros((layers, 128, 128), dtype=bool)
+    # Floor patches plus blocky obstacles, compressing like a real map
+    for _ in range(8):
+        x, y = rng.integers(0, 96, size=2)
+        grid[rng.integers(0, 3), y:y + 32, x:x + 32] = True
+    for _ in range(60):
+        x, y = rng.integers(0, 124, size=2)
+        z = rng.integers(0, layers - 4)
+        dx, dy, dz = rng.integers(1, 5, size=3)
+        grid[z:z + dz, y:y + dy, x:x + dx] = True
+    payload = lz4_block_compress(np.packbits(grid).tobytes())
+    header = json.dumps(
+        {
+            "type": "msg",
+            "topic": VOXEL_MAP_TOPIC,
+            "data": {
+                "origin": [float(rng.uniform(-5, 5)), float(rng.uniform(-5, 5)), -0.6],
+                "resolution": 0.05,
+                "src_size": len(payload),
+            },
+        }
+    ).encode("utf-8")
+    return struct.pack("H", len(header)) + b"\x00\x00" + header + payload
+
+
+def load_corpus(recording, frames):
+    if recording:
+        from go2_webrtc.recorder import StreamReader
+
+        messages = [
+            message
+            for _, _, message in StreamReader(recording).messages(topics=[VOXEL_MAP_TOPIC])
+        ]
+        if not messages:
+            raise SystemExit(f"No {VOXEL_MAP_TOPIC} messages in {recording}")
+        return messages
+    return [synthetic_message(seed) for seed in range(min(frames, 50))]
+
+
+def split_message(message):
+    length = struct.unpack("H", message[:2])[0]
+    return json.loads(message[4:4 + length])["data"], message[4 + length:]
+
+
+def run_case(backend, mode, target, recording, frames, warmup):
+    corpus = load_corpus(recording, frames)
+    decoder = LidarDecoder(backend=backend)
+    split = [split_message(message) for message in corpus]
+
+    if target == "decode":
+        def step(i):
+            header, payload = split[i % len(split)]
+            decoder.decode(payload, header, mode=mode)
+    else:
+        def step(i):
+            deal_array_buffer(corpus[i % len(corpus)], decoder, mode)
+
+    for i in range(warmup):
+        step(i)
+
+    latencies = np.empty(frames)
+    began = time.perf_counter()
+    for i in range(frames):
+        start = time.perf_counter()
+        step(i)
+        latencies[i] = time.perf_counter() - start
+    elapsed = time.perf_counter() - began
+
+    # Peak bytes allocated while decoding one frame
+    tracemalloc.start()
+    peaks = []
+    for i in range(TRACED_FRAMES):
+        tracemalloc.reset_peak()
+        base = tracemalloc.get_traced_memory()[0]
+        step(i)
+        peaks.append(tracemalloc.get_traced_memory()[1] - base)
+    tracemalloc.stop()
+
+    p50, p95, p99 = np.percentile(latencies, [50, 95, 99]) * 1000
+    return {
+        "backend": backend,
+        "mode": mode,
+        "target": target,
+        "frames": frames,
+        "fps": frames / elapsed,
+        "p50_ms": p50,
+        "p95_ms": p95,
+        "p99_ms": p99,
+        # ru_maxrss is KiB on Linux
+        "peak_rss_mib": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        "alloc_kib_per_frame": statistics.median(peaks) / 1024,
+    }
+
+
+def spawn_case(backend, mode, target, args):
+    command = [
+        sys.executable, os.path.abspath(__file__), "--case", backend, mode, target,
+        "--frames", str(args.frames), "--warmup", str(args.warmup),
+    ]
+    if args.recording:
+        command += ["--recording", args.recording]
+    output = subprocess.run(command, capture_output=True, check=True, text=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def regressions(results, baseline, max_regression):
+    previous = {(r["backend"], r["mode"], r["target"]): r for r in baseline}
+    failures = []
+    for result in results:
+        old = previous.get((result["backend"], result["mode"], result["target"]))
+        if old is None:
+            continue
+        for key in ("p50_ms", "p99_ms"):
+            if result[key] > old[key] * (1 + max_regression):
+                failures.append(
+                    f"{result['backend']}/{result['mode']}/{result['target']} {key} "
+                    f"{old[key]:.3f} -> {result[key]:.3f}"
+                )
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--recording", help="StreamRecorder directory to take frames from")
+    parser.add_argument("--frames", type=int, default=500)
+    parser.add_argument("--warmup", type=int, default=20)
+    parser.add_argument("--backend", nargs="+", default=["wasm", "numpy"])
+    parser.add_argument("--mode", nargs="+", default=["mesh", "points"])
+    parser.add_argument("--target", nargs="+", default=TARGETS, choices=TARGETS)
+    parser.add_argument("--json", help="Write the results to this file")
+    parser.add_argument("--baseline", help="Results of an earlier run to compare against")
+    parser.add_argument("--max-regression", type=float, default=0.1)
+    parser.add_argument("--case", nargs=3, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.case:
+        print(json.dumps(run_case(*args.case, args.recording, args.frames, args.warmup)))
+        return
+
+    results = []
+    for backend in args.backend:
+        for mode in args.mode:
+            for target in args.target:
+                result = spawn_case(backend, mode, target, args)
+                results.append(result)
+                print(
+                    f"{backend:6s} {mode:6s} {target:8s} {result['fps']:8.1f} fps  "
+                    f"p50 {result['p50_ms']:7.3f}  p95 {result['p95_ms']:7.3f}  "
+                    f"p99 {result['p99_ms']:7.3f} ms  rss {result['peak_rss_mib']:6.1f} MiB  "
+                    f"alloc {result['alloc_kib_per_frame']:8.1f} KiB/frame"
+                )
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            failures = regressions(results, json.load(f), args.max_regression)
+        for failure in failures:
+            print(f"REGRESSION {failure}")
+        if failures:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -22,11 +22,10 @@
 # OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
 
 import asyncio
-import json
 import os
 import pygame
 
-from go2_webrtc import Go2Connection, ROBOT_CMD
+from go2_webrtc import Go2Connection, ROBOT_CMD, codec
 
 
 JOY_SENSE = 0.2
@@ -38,10 +37,10 @@ def gen_command(cmd: int):
         "topic": "rt/api/sport/request",
         "data": {
             "header": {"identity": {"id": Go2Connection.generate_id(), "api_id": cmd}},
-            "parameter": json.dumps(cmd),
+            # The sport API expects the parameter as a JSON string
+            "parameter": codec.dumps(cmd),
         },
     }
-    command = json.dumps(command)
     return command
 
 
@@ -54,10 +53,9 @@ def gen_mov_command(x: float, y: float, z: float):
         "topic": "rt/api/sport/request",
         "data": {
             "header": {"identity": {"id": Go2Connection.generate_id(), "api_id": 1008}},
-            "parameter": json.dumps({"x": x, "y": y, "z": z}),
+            "parameter": codec.dumps({"x": x, "y": y, "z": z}),
         },
     }
-    command = json.dumps(command)
     return command
 
 
@@ -101,15 +99,15 @@ async def start_joy_bridge(robot_conn):
 
         if joy_btn_a_is_pressed == 1:
             robot_cmd = gen_command(ROBOT_CMD["StandUp"])
-            robot_conn.data_channel.send(robot_cmd)
+            robot_conn.sender.send(robot_cmd)
 
         if joy_btn_b_is_pressed == 1:
             robot_cmd = gen_command(ROBOT_CMD["StandDown"])
-            robot_conn.data_channel.send(robot_cmd)
+            robot_conn.sender.send(robot_cmd)
 
         if abs(joy_move_x) > 0.0 or abs(joy_move_y) > 0.0 or abs(joy_move_z) > 0.0:
             robot_cmd = gen_mov_command(joy_move_x, joy_move_y, joy_move_z)
-            robot_conn.data_channel.send(robot_cmd)
+            robot_conn.sender.send(robot_cmd)
 
         await asyncio.sleep(0.1)
 
@@ -25,14 +25,21 @@ import asyncio
 import os
 import paho.mqtt.client as mqtt
 import logging
-import json
 from queue import Queue, Empty
 
 
-from go2_webrtc import Go2Connection, RTC_TOPIC
+from go2_webrtc import Go2Connection, RTC_TOPIC, codec
 
 MQTT_TOPIC = "/rt/mqtt/request"
 
+# High-rate state topics are forwarded at most this many times per second
+STATE_TOPICS = [
+    RTC_TOPIC["LOW_STATE"],
+    RTC_TOPIC["SPORT_MOD_STATE"],
+    RTC_TOPIC["LF_SPORT_MOD_STATE"],
+]
+STATE_RATE = float(os.getenv("MQTT_STATE_RATE", 5))
+
 logging.basicConfig(level=logging.WARN)
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.DEBUG)
@@ -84,9 +91,17 @@ class Go2MQTTBridge:
                     try:
                         while not self.msg_queue.empty():
                             msg = self.msg_queue.get_nowait()
-                            msg = msg.decode("utf-8")
                             logger.debug(f"MQTT->RTC Sending message {msg} to Go2")
-                            conn.data_channel.send(msg)
+                            try:
+                                payload = codec.loads(msg)
+                            except codec.DecodeError as e:
+                                logger.warning("MQTT: skipping message that is not JSON: %s", e)
+                                continue
+                            if not isinstance(payload, dict):
+                                logger.warning("MQTT: skipping message that is not a JSON object")
+                                continue
+                            # Through the scheduler, so stale moves get coalesced
+                            conn.sender.send(payload)
                     except Empty:
                         pass
                     # wait for a short time before checking the queue again
@@ -96,8 +111,10 @@ class Go2MQTTBridge:
                 await asyncio.sleep(1)
 
     def on_validated(self):
+        for topic in STATE_TOPICS:
+            conn.conflate(topic, self.on_data_channel_message, STATE_RATE)
         for topic in RTC_TOPIC.values():
-            conn.data_channel.send(json.dumps({"type": "subscribe", "topic": topic}))
+            conn.subscribe(topic)
 
     def on_data_channel_message(self, message, msgobj):
         logger.debug(
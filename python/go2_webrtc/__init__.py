@@ -21,5 +21,36 @@
 # OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
 # OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
 
-from .go2_connection import Go2Connection
+import importlib
+
 from .constants import SPORT_CMD, DATA_CHANNEL_TYPE, RTC_TOPIC, ROBOT_CMD
+
+# Heavy modules are only imported on first access, so that using the
+# constants does not pull in aiortc, wasmtime or the .env/logging setup
+# done by go2_connection.
+_LAZY_ATTRIBUTES = {
+    "Go2Connection": ".go2_connection",
+    "LidarDecoder": ".lidar_decoder",
+    "LidarDecodePool": ".lidar_pool",
+}
+
+__all__ = [
+    "SPORT_CMD",
+    "DATA_CHANNEL_TYPE",
+    "RTC_TOPIC",
+    "ROBOT_CMD",
+    *_LAZY_ATTRIBUTES,
+]
+
+
+def __getattr__(name):
+    module_name = _LAZY_ATTRIBUTES.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module_name, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY_ATTRIBUTES))
@@ -0,0 +1,85 @@
+# Copyright (c) 2024, RoboVerse community
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice, this
+#    list of conditions and the following disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+# JSON encoding of data channel traffic.
+#
+# Uses orjson or msgspec when one is installed and falls back to the
+# standard library. The backend can be forced with the GO2_WEBRTC_JSON
+# environment variable or `use`. Call through the module (codec.dumps),
+# `use` rebinds the functions.
+
+import json
+import os
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgspec
+except ImportError:
+    msgspec = None
+
+
+BACKENDS = ["orjson", "msgspec", "json"]
+
+# Raised by `loads` on malformed input, whatever the backend
+DecodeError = (json.JSONDecodeError,) + ((msgspec.DecodeError,) if msgspec else ())
+
+
+def available():
+    return [
+        name
+        for name, module in zip(BACKENDS, [orjson, msgspec, json])
+        if module is not None
+    ]
+
+
+def use(name):
+    """Select the JSON backend, one of `available()`."""
+    global backend, dumps, loads
+    if name not in available():
+        raise ValueError(f"JSON backend {name!r} is not available, have {available()}")
+
+    if name == "orjson":
+        def dumps(obj):
+            return orjson.dumps(obj).decode("utf-8")
+
+        loads = orjson.loads
+    elif name == "msgspec":
+        encode = msgspec.json.Encoder().encode
+        loads = msgspec.json.Decoder().decode
+
+        def dumps(obj):
+            return encode(obj).decode("utf-8")
+    else:
+        dumps = json.dumps
+        loads = json.loads
+    backend = name
+
+
+backend = None
+dumps = None
+loads = None
+use(os.getenv("GO2_WEBRTC_JSON") or available()[0])
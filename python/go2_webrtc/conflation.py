@@ -0,0 +1,116 @@
+# Copyright (c) 2024, RoboVerse community
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice, this
+#    list of conditions and the following disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+import asyncio
+import logging
+import time
+
+
+logger = logging.getLogger(__name__)
+
+
+class Latest:
+    __slots__ = ("message", "stamp", "seq", "msgobj")
+
+    def __init__(self):
+        self.message = None
+        self.stamp = None
+        # Bumped for every message, msgobj is parsed for the current seq only
+        self.seq = 0
+        self.msgobj = None
+
+
+class Conflator:
+    """Keep only the latest raw message of high-rate topics.
+
+    Messages on a conflated topic are stored as received and replace the
+    previous one, nothing is parsed until a consumer asks for it through
+    `latest` or a fixed-rate subscription. A message is parsed at most
+    once, however many consumers read it. `parse` turns a raw message into
+    its msgobj.
+    """
+
+    def __init__(self, parse):
+        self.parse = parse
+        self.entries = {}
+        self.tasks = {}
+
+    def __contains__(self, topic):
+        return topic in self.entries
+
+    def add(self, topic):
+        self.entries.setdefault(topic, Latest())
+
+    def remove(self, topic):
+        self.entries.pop(topic, None)
+        for task in self.tasks.pop(topic, []):
+            task.cancel()
+
+    def offer(self, topic, message):
+        entry = self.entries[topic]
+        entry.message = message
+        entry.stamp = time.monotonic()
+        entry.seq += 1
+        entry.msgobj = None
+
+    def latest(self, topic):
+        """Return the latest msgobj of `topic`, None if nothing arrived yet."""
+        entry = self.entries.get(topic)
+        if entry is None or entry.message is None:
+            return None
+        if entry.msgobj is None:
+            entry.msgobj = self.parse(entry.message)
+        return entry.msgobj
+
+    def subscribe(self, topic, callback, rate):
+        """Call `callback(message, msgobj)` at most `rate` times per second.
+
+        Only the latest message is delivered, and only if it is new since
+        the previous call. Returns the task running the subscription.
+        """
+        self.add(topic)
+        task = asyncio.ensure_future(self.run_subscription(topic, callback, 1.0 / rate))
+        self.tasks.setdefault(topic, []).append(task)
+        return task
+
+    async def run_subscription(self, topic, callback, interval):
+        loop = asyncio.get_running_loop()
+        seen = 0
+        due = loop.time()
+        while True:
+            due += interval
+            await asyncio.sleep(max(due - loop.time(), 0.0))
+            entry = self.entries.get(topic)
+            if entry is None or entry.seq == seen:
+                continue
+            seen = entry.seq
+            try:
+                callback(entry.message, self.latest(topic))
+            except Exception as e:
+                logger.error("Conflated callback for %s failed: %s", topic, e)
+
+    def close(self):
+        for tasks in self.tasks.values():
+            for task in tasks:
+                task.cancel()
+        self.tasks.clear()
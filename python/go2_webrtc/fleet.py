@@ -0,0 +1,216 @@
+# Copyright (c) 2024, RoboVerse community
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice, this
+#    list of conditions and the following disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+import asyncio
+import logging
+import os
+
+from go2_webrtc.latency import LatencyHistogram, LatencyProbe
+from go2_webrtc.lidar_pool import LidarDecodePool, make_executor
+from go2_webrtc.supervisor import ConnectionSupervisor
+
+
+logger = logging.getLogger(__name__)
+
+
+class FleetRobot:
+    """One robot of a FleetManager: its supervisor, decode pool and probe."""
+
+    def __init__(self, name, supervisor, decode_pool):
+        self.name = name
+        self.supervisor = supervisor
+        self.decode_pool = decode_pool
+        self.probe = None
+        # Messages delivered to the fleet's on_message
+        self.received = 0
+
+    @property
+    def conn(self):
+        return self.supervisor.conn
+
+
+class FleetManager:
+    """Drive connections to many robots from one event loop.
+
+    Every robot gets a ConnectionSupervisor, so each has its own
+    Go2Connection and SendScheduler and reconnects on its own. Binary
+    messages of all robots are decoded by one shared executor of
+    `decode_workers` workers. Each robot's LidarDecodePool may occupy at
+    most `robot_workers` of them and queue `max_pending` messages, so a
+    robot streaming faster than it can be decoded drops its own frames
+    instead of delaying the other robots'. If a worker dies, the shared
+    executor is replaced for all robots.
+
+    `on_message(name, message, msgobj)` gets the messages of every robot.
+    Other keyword arguments are passed to every ConnectionSupervisor.
+    """
+
+    def __init__(
+        self,
+        on_message=None,
+        decode_workers=None,
+        executor="process",
+        robot_workers=1,
+        max_pending=2,
+        mode="mesh",
+        policy="drop-oldest",
+        probe_interval=2.0,
+        **options,
+    ):
+        self.on_message = on_message
+        self.decode_workers = decode_workers
+        self.executor_type = executor
+        self.robot_workers = robot_workers
+        self.max_pending = max_pending
+        self.mode = mode
+        self.policy = policy
+        self.probe_interval = probe_interval
+        self.options = options
+        self.executor = None
+        self.robots = {}
+        self.running = False
+
+    def make_executor(self):
+        return make_executor(self.executor_type, self.decode_workers or os.cpu_count() or 1)
+
+    def add(self, name, ip, token="", **options):
+        """Add a robot, started right away if the fleet is running."""
+        if name in self.robots:
+            raise ValueError(f"Robot {name!r} is already in the fleet")
+        if self.executor is None:
+            self.executor = self.make_executor()
+        decode_pool = LidarDecodePool(
+            workers=self.robot_workers,
+            max_pending=self.max_pending,
+            mode=self.mode,
+            executor=self.executor,
+            policy=self.policy,
+            on_broken=self.replace_executor,
+        )
+        robot = None
+
+        def on_message(message, msgobj):
+            robot.received += 1
+            if self.on_message:
+                self.on_message(name, message, msgobj)
+
+        supervisor = ConnectionSupervisor(
+            ip,
+            token,
+            on_validated=lambda: self.on_validated(robot),
+            on_message=on_message,
+            decode_pool=decode_pool,
+            **{**self.options, **options},
+        )
+        robot = FleetRobot(name, supervisor, decode_pool)
+        self.robots[name] = robot
+        if self.running:
+            supervisor.start()
+        return robot
+
+    def replace_executor(self, broken):
+        """Swap a broken shared executor for a new one on every robot."""
+        if broken is not self.executor:
+            return
+        logger.error("A decode worker died, restarting the shared decode workers")
+        broken.shutdown(wait=False, cancel_futures=True)
+        self.executor = self.make_executor()
+        for robot in self.robots.values():
+            robot.decode_pool.executor = self.executor
+
+    async def remove(self, name):
+        robot = self.robots.pop(name)
+        await self.stop_robot(robot)
+
+    def on_validated(self, robot):
+        # The probe survives reconnects, so its histograms cover them
+        if self.probe_interval:
+            if robot.probe is None:
+                robot.probe = LatencyProbe(robot.conn, self.probe_interval)
+            robot.probe.stop()
+            robot.probe.conn = robot.conn
+            robot.probe.start()
+        logger.info("Robot %s is connected", robot.name)
+
+    def start(self):
+        self.running = True
+        for robot in self.robots.values():
+            robot.supervisor.start()
+
+    async def stop(self):
+        self.running = False
+        await asyncio.gather(*(self.stop_robot(robot) for robot in self.robots.values()))
+        if self.executor is not None:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            self.executor = None
+
+    async def stop_robot(self, robot):
+        if robot.probe is not None:
+            robot.probe.stop()
+        await robot.supervisor.stop()
+        robot.decode_pool.shutdown(wait=False)
+
+    def send(self, name, payload):
+        """Send `payload` to one robot, False while it is reconnecting."""
+        conn = self.robots[name].conn
+        if conn is None:
+            return False
+        conn.sender.send(payload)
+        return True
+
+    def broadcast(self, payload):
+        """Send `payload` to every connected robot, returns their names."""
+        return [name for name in self.robots if self.send(name, payload)]
+
+    async def health(self, transport=False):
+        """Return per-robot health and fleet-wide totals."""
+        robots = {}
+        rtt = LatencyHistogram()
+        for name, robot in self.robots.items():
+            supervisor = robot.supervisor
+            conn = supervisor.conn
+            pool = robot.decode_pool
+            entry = {
+                "connected": conn is not None,
+                "reconnects": supervisor.reconnects,
+                "last_recovery_s": supervisor.last_recovery,
+                "received": robot.received,
+                "decode_pending": pool.qsize(),
+                "decode_dropped": pool.dropped,
+            }
+            if conn is not None:
+                entry["sent"] = conn.sender.sent
+                entry["superseded"] = conn.sender.superseded
+            if robot.probe is not None:
+                entry["latency"] = await robot.probe.stats(transport and conn is not None)
+                rtt.merge(robot.probe.rtt.window())
+            robots[name] = entry
+
+        return {
+            "robots": robots,
+            "connected": sum(entry["connected"] for entry in robots.values()),
+            "total": len(robots),
+            "received": sum(entry["received"] for entry in robots.values()),
+            "decode_dropped": sum(entry["decode_dropped"] for entry in robots.values()),
+            "heartbeat_rtt": rtt.summary(),
+        }
@@ -0,0 +1,56 @@
+# Copyright (c) 2024, RoboVerse community
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice, this
+#    list of conditions and the following disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+# Cheap inspection of raw data channel messages, without parsing them.
+
+import re
+import struct
+
+from go2_webrtc import codec
+
+
+TOPIC_PATTERN = re.compile(r'"topic"\s*:\s*"((?:[^"\\]|\\.)*)"')
+
+
+def peek_topic(message):
+    """Return the topic of a raw text or binary message, or "" if it has none.
+
+    Text messages are scanned for the first "topic" key instead of being
+    parsed. Binary messages only have their small JSON header decoded.
+    """
+    if isinstance(message, str):
+        match = TOPIC_PATTERN.search(message)
+        return match.group(1) if match else ""
+    header = binary_header(message)
+    return header.get("topic", "") if header else ""
+
+
+def binary_header(message):
+    """Parse the JSON header of a binary message, None if it is malformed."""
+    if len(message) < 4:
+        return None
+    length = struct.unpack("H", message[:2])[0]
+    try:
+        return codec.loads(bytes(message[4 : 4 + length]))
+    except (UnicodeDecodeError,) + codec.DecodeError:
+        return None
@@ -31,7 +31,8 @@ from aiortc import (
 from aiortc.contrib.media import MediaBlackhole, MediaRecorder
 import aiohttp
 import datetime
-import random
+import itertools
+import threading
 import binascii
 import uuid
 from Crypto.PublicKey import RSA
@@ -47,10 +48,14 @@ from dotenv import load_dotenv
 import os
 import json
 import hashlib
-import struct
 import base64
 
-from go2_webrtc.lidar_decoder import LidarDecoder
+from go2_webrtc import codec
+from go2_webrtc.conflation import Conflator
+from go2_webrtc.framing import peek_topic
+from go2_webrtc.lidar_decoder import LidarDecoder, deal_array_buffer
+from go2_webrtc.rsa_keys import get_resolver
+from go2_webrtc.scheduler import SendScheduler
 
 
 load_dotenv()
@@ -61,7 +66,62 @@ logger = logging.getLogger(__name__)
 logger.setLevel(logging.DEBUG)
 
 
-decoder = LidarDecoder()
+# Created on the first binary message, control-only users never pay for it
+decoder = None
+
+# Shared by the async signaling requests, so connections to the robot are
+# pooled; bound to the event loop it was created on
+session = None
+session_loop = None
+
+
+def get_session():
+    global session, session_loop
+    loop = asyncio.get_running_loop()
+    if session is not None and not session.closed and session_loop is not loop:
+        release_session(session, session_loop)
+    if session is None or session.closed or session_loop is not loop:
+        session = aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit_per_host=4))
+        session_loop = loop
+    return session
+
+
+def release_session(old_session, old_loop):
+    """Close a session left behind on another event loop."""
+    if old_loop.is_running():
+        # Owned by a loop in another thread, close it there
+        asyncio.run_coroutine_threadsafe(old_session.close(), old_loop)
+    elif not old_loop.is_closed():
+        # A stopped loop can be run to completion from any idle thread
+        closer = threading.Thread(
+            target=old_loop.run_until_complete, args=(old_session.close(),)
+        )
+        closer.start()
+        closer.join()
+    else:
+        logger.warning(
+            "Signaling session was not closed with close_session() before its event loop ended"
+        )
+
+
+async def close_session():
+    global session
+    if session is not None:
+        await session.close()
+        session = None
+
+# Request ids, seeded from the clock like the robot's own clients but
+# strictly increasing, so ids from one process never collide
+request_ids = itertools.count(
+    int(datetime.datetime.now().timestamp() * 1000 % 2147483648)
+)
+
+
+def get_decoder():
+    global decoder
+    if decoder is None:
+        decoder = LidarDecoder()
+    return decoder
 
 
 class Go2AudioTrack(AudioStreamTrack):
@@ -74,7 +134,17 @@ class Go2VideoTrack(VideoStreamTrack):
 
 class Go2Connection:
     def __init__(
-        self, ip=None, token="", on_validated=None, on_message=None, on_open=None
+        self,
+        ip=None,
+        token="",
+        on_validated=None,
+        on_message=None,
+        on_open=None,
+        decode_pool=None,
+        recorder=None,
+        router=None,
+        video=None,
+        video_recorder=None,
     ):
         self.pc = RTCPeerConnection()
         self.ip = ip
@@ -83,6 +153,19 @@ class Go2Connection:
         self.on_validated = on_validated
         self.on_message = on_message
         self.on_open = on_open
+        # Optional LidarDecodePool; binary messages are then decoded in
+        # worker processes instead of on the event loop
+        self.decode_pool = decode_pool
+        # Optional StreamRecorder, gets every raw message as it arrives
+        self.recorder = recorder
+        # Optional TopicRouter; messages on topics it has no handler for are
+        # dropped before they are parsed
+        self.router = router
+        # Optional VideoConsumer; the robot's camera track is then requested
+        # and fed to it
+        self.video = video
+        # Optional VideoSegmentRecorder, records the camera track as received
+        self.video_recorder = video_recorder
 
         # self.audio_track = Go2AudioTrack()
         # self.video_track = Go2VideoTrack()
@@ -94,11 +177,24 @@ class Go2Connection:
         self.data_channel = self.pc.createDataChannel("data", id=2, negotiated=False)
         self.data_channel.on("open", self.on_data_channel_open)
         self.data_channel.on("message", self.on_data_channel_message)
+        # All outgoing messages go through here, see SendScheduler
+        self.sender = SendScheduler(self.data_channel)
+        # Request id -> future waiting for the response, see request()
+        self.pending = {}
+        # Set by LatencyProbe.start(), gets the heartbeat echoes
+        self.latency_probe = None
+        # Topics whose messages are only parsed on demand, see conflate()
+        self.conflator = Conflator(self.parse_message)
+        # Topics subscribed through subscribe(), in subscription order
+        self.subscriptions = {}
 
         # self.pc.addTransceiver("video", direction="recvonly")
         # self.pc.addTransceiver("audio", direction="sendrecv")
         # self.pc.addTrack(AudioStreamTrack())
 
+        if video is not None or video_recorder is not None:
+            self.pc.addTransceiver("video", direction="recvonly")
+
         self.pc.on("track", self.on_track)
         self.pc.on("connectionstatechange", self.on_connection_state_change)
 
@@ -112,7 +208,14 @@ class Go2Connection:
             # self.audio_track.addTrack(track)
         elif track.kind == "video":
             # self.video_track.addTrack(track)
-            pass
+            if self.video_recorder is not None:
+                receiver = next(
+                    t.receiver for t in self.pc.getTransceivers() if t.receiver.track is track
+                )
+                # Without a consumer the frames need not be decoded at all
+                self.video_recorder.attach(receiver, decode=self.video is not None)
+            if self.video is not None:
+                self.video.start(track)
 
     async def generate_offer(self):
         logger.debug("Generating offer")
@@ -128,6 +231,12 @@ class Go2Connection:
     async def connect(self):
         logger.info("Connected to the robot")
 
+    async def close(self):
+        self.conflator.close()
+        if self.video is not None:
+            await self.video.stop()
+        await self.pc.close()
+
     async def set_answer(self, sdp):
         """Set the remote description with the provided answer."""
         answer = RTCSessionDescription(sdp, type="answer")
@@ -139,30 +248,96 @@ class Go2Connection:
             self.on_open()
 
     def on_data_channel_message(self, message):
-        logger.debug("Received message: %s", message)
+        if self.recorder:
+            self.recorder.record(message)
 
         # If the data channel is not open, open it
         # it should not be closed if got a message
         if self.data_channel.readyState != "open":
             self.data_channel._setReadyState("open")
 
+        topic = None
+        if self.conflator.entries:
+            topic = peek_topic(message)
+            if topic in self.conflator:
+                self.conflator.offer(topic, message)
+                return
+
+        if self.router is not None:
+            if topic is None:
+                topic = peek_topic(message)
+            # Responses to our own requests are needed even without a route
+            awaited = self.pending and topic.endswith("/response")
+            if not awaited and not self.router.wants(topic):
+                return
+
+        logger.debug("Received message: %s", message)
+
         try:
             if isinstance(message, str):
-                msgobj = json.loads(message)
+                msgobj = codec.loads(message)
                 if msgobj.get("type") == "validation":
                     self.validate(msgobj)
+                elif msgobj.get("type") == DATA_CHANNEL_TYPE["HEARTBEAT"]:
+                    if self.latency_probe:
+                        self.latency_probe.on_heartbeat(msgobj)
+                elif self.pending:
+                    self.resolve_request(msgobj)
             elif isinstance(message, bytes):
+                if self.decode_pool:
+                    self.decode_binary_message(message)
+                    return
                 msgobj = Go2Connection.deal_array_buffer(message)
 
-            if self.on_message:
-                self.on_message(message, msgobj)
+            self.dispatch_message(message, msgobj)
 
-        except json.JSONDecodeError:
+        except codec.DecodeError:
             pass
 
+    def parse_message(self, message):
+        if isinstance(message, str):
+            return codec.loads(message)
+        return Go2Connection.deal_array_buffer(message)
+
+    def conflate(self, topic, callback=None, rate=None):
+        """Keep only the latest message of `topic`, parsed on demand.
+
+        Messages on the topic are no longer dispatched one by one; read
+        them with `latest(topic)`, or pass `callback` and `rate` to get
+        the latest one at most `rate` times per second.
+        """
+        self.conflator.add(topic)
+        if callback is not None:
+            return self.conflator.subscribe(topic, callback, rate)
+        return None
+
+    def latest(self, topic):
+        """Return the latest msgobj of a conflated topic, None if none arrived."""
+        return self.conflator.latest(topic)
+
+    def dispatch_message(self, message, msgobj):
+        if self.router is not None:
+            self.router.dispatch(message, msgobj)
+        if self.on_message:
+            self.on_message(message, msgobj)
+
+    def decode_binary_message(self, message):
+        # Nobody would see the result, skip the decode entirely
+        if not self.on_message and self.router is None:
+            return
+        try:
+            self.decode_pool.put_nowait(message, self.dispatch_message)
+        except asyncio.QueueFull:
+            logger.warning("Decode pool is full, dropping binary message")
+        except RuntimeError as e:
+            logger.error("Decode pool unavailable, dropping binary message: %s", e)
+
     def validate(self, message):
         if message.get("data") == "Validation Ok.":
             self.validation_result = "SUCCESS"
+            if self.video is not None or self.video_recorder is not None:
+                # The robot only starts the camera stream when asked to
+                self.publish("", "on", DATA_CHANNEL_TYPE["VID"])
             if self.on_validated:
                 self.on_validated()
         else:
@@ -172,23 +347,67 @@ class Go2Connection:
                 DATA_CHANNEL_TYPE["VALIDATION"],
             )
 
-    def publish(self, topic, data, msg_type):
-        if not self.data_channel or not self.data_channel.readyState == "open":
-            logger.error(
-                "Data channel is not open. State is %s", self.data_channel.readyState
+    async def request(self, topic, api_id, parameter=None, timeout=5.0):
+        """Send an API request and wait for the matching response.
+
+        `parameter` is JSON encoded into the request. Returns the `data` of
+        the response, whose header.status.code is 0 on success. Raises
+        asyncio.TimeoutError when no response arrives within `timeout`
+        seconds. Any number of requests can be in flight at once.
+        """
+        if self.data_channel.readyState != "open":
+            raise ConnectionError("Data channel is not open")
+        request_id = Go2Connection.generate_id()
+        future = asyncio.get_running_loop().create_future()
+        self.pending[request_id] = future
+        try:
+            self.publish(
+                topic,
+                {
+                    "header": {"identity": {"id": request_id, "api_id": api_id}},
+                    "parameter": "" if parameter is None else codec.dumps(parameter),
+                },
+                DATA_CHANNEL_TYPE["MSG"],
             )
+            return await asyncio.wait_for(future, timeout)
+        finally:
+            self.pending.pop(request_id, None)
+
+    def resolve_request(self, msgobj):
+        try:
+            request_id = msgobj["data"]["header"]["identity"]["id"]
+        except (KeyError, TypeError):
             return
+        future = self.pending.pop(request_id, None)
+        if future is not None and not future.done():
+            future.set_result(msgobj["data"])
+
+    def subscribe(self, topic):
+        """Ask the robot to send messages of `topic`."""
+        self.subscriptions[topic] = None
+        self.sender.send({"type": DATA_CHANNEL_TYPE["SUBSCRIBE"], "topic": topic})
+
+    def unsubscribe(self, topic):
+        self.subscriptions.pop(topic, None)
+        self.sender.send({"type": DATA_CHANNEL_TYPE["UNSUBSCRIBE"], "topic": topic})
+
+    def publish(self, topic, data, msg_type):
         payload = {
-            "type": msg_type or DATA_CHANNEL_TYPE["MESSAGE"],
+            "type": msg_type or DATA_CHANNEL_TYPE["MSG"],
             "topic": topic,
             "data": data,
         }
-        logger.debug("-> Sending message %s", json.dumps(payload))
-        self.data_channel.send(json.dumps(payload))
+        self.sender.send(payload)
 
     async def connect_robot_v10(self):
-        """Post the offer to an HTTP server and set the received answer."""
-        offer_sdp = await self.generate_offer()
+        """Post the offer to an HTTP server and set the received answer.
+
+        An offer generated beforehand, as ConnectionSupervisor does for its
+        standby connection, is used as is.
+        """
+        if self.pc.localDescription is None:
+            await self.generate_offer()
+        offer_sdp = self.pc.localDescription.sdp
         async with aiohttp.ClientSession() as session:
             url = f"http://{self.ip}:8081/offer"
             headers = {"content-type": "application/json"}
@@ -211,6 +430,15 @@ class Go2Connection:
                 else:
                     logger.info("Failed to get answer from server")
 
+    async def connect_robot_v11(self):
+        """Exchange the offer through the encrypted signaling on port 9991."""
+        if self.pc.localDescription is None:
+            await self.generate_offer()
+        answer = await Go2Connection.get_peer_answer_async(
+            self.pc.localDescription, self.token, self.ip
+        )
+        await self.set_answer(answer["sdp"])
+
     async def connect_robot(self):
         # Force old firmware method only - new method is broken
         logger.info("Using old firmware method only (port 8081)...")
@@ -218,110 +446,152 @@ class Go2Connection:
 
     @staticmethod
     def get_peer_answer(sdp_offer, token, robot_ip):
-        sdp_offer_json = {
-            "id": "STA_localNetwork",
-            "sdp": sdp_offer.sdp,
-            "type": sdp_offer.type,
-            "token": token,
-        }
-
-        new_sdp = json.dumps(sdp_offer_json)
+        new_sdp = Go2Connection.peer_offer_json(sdp_offer, token)
         url = f"http://{robot_ip}:9991/con_notify"
         response = Go2Connection.make_local_request(url, body=None, headers=None)
-        
+
         # Add delay to avoid rate limiting between requests
         import time
         time.sleep(1)
 
-        if response:
-            logger.debug(f"Initial response: {response.text[:200]}...")
-            # Decode the response text from base64
-            decoded_response = base64.b64decode(response.text).decode("utf-8")
-            logger.debug(f"Decoded response: {decoded_response[:200]}...")
+        if not response:
+            raise ValueError(
+                "Failed to receive initial public key response with new method."
+            )
 
-            # Parse the decoded response as JSON
-            decoded_json = json.loads(decoded_response)
-            logger.debug(f"Decoded JSON keys: {decoded_json.keys()}")
+        path_ending, body, headers, aes_key = Go2Connection.prepare_con_ing(
+            response.text, new_sdp, robot_ip
+        )
+        # URL for the second request
+        url = f"http://{robot_ip}:9991/con_ing_{path_ending}"
+        logger.debug(f"Sending data to: {url}")
+        response = Go2Connection.make_local_request(url, body=body, headers=headers)
+
+        # If response is successful, decrypt it
+        if not response:
+            logger.error(f"No response from robot at {url}")
+            raise ValueError(f"Failed to get answer from server")
+        logger.debug(f"Got response: {response.status_code}, length: {len(response.text)}")
+        return Go2Connection.parse_peer_answer(response.text, aes_key)
 
-            # Extract both data1 and data2 fields
-            data1 = decoded_json.get("data1")
-            data2 = decoded_json.get("data2", "")
-            logger.debug(f"Data1 length: {len(data1)}, first 50 chars: {data1[:50]}")
-            logger.debug(f"Data2 type: {type(data2)}, value: {data2}")
+    @staticmethod
+    async def get_peer_answer_async(
+        sdp_offer, token, robot_ip, session=None, pause=1.0, port=9991
+    ):
+        """Non-blocking version of get_peer_answer.
+
+        HTTP goes through `session`, or a shared pooled ClientSession, the
+        retry backoff and the `pause` between the two requests are awaited,
+        and the RSA/AES work runs in the default executor.
+        """
+        session = session or get_session()
+        loop = asyncio.get_running_loop()
+        new_sdp = Go2Connection.peer_offer_json(sdp_offer, token)
+
+        url = f"http://{robot_ip}:{port}/con_notify"
+        text = await Go2Connection.make_local_request_async(session, url)
+        if text is None:
+            raise ValueError(
+                "Failed to receive initial public key response with new method."
+            )
+        # Add delay to avoid rate limiting between requests
+        await asyncio.sleep(pause)
+
+        path_ending, body, headers, aes_key = await loop.run_in_executor(
+            None, Go2Connection.prepare_con_ing, text, new_sdp, robot_ip
+        )
+        url = f"http://{robot_ip}:{port}/con_ing_{path_ending}"
+        logger.debug(f"Sending data to: {url}")
+        text = await Go2Connection.make_local_request_async(session, url, body, headers)
+        if text is None:
+            logger.error(f"No response from robot at {url}")
+            raise ValueError(f"Failed to get answer from server")
+        return await loop.run_in_executor(
+            None, Go2Connection.parse_peer_answer, text, aes_key
+        )
 
-            # Try data2 as the public key first, then data1
-            public_key_pem = str(data2) if data2 and isinstance(data2, str) else data1[10 : len(data1) - 10]
-            logger.debug(f"Using key from data{'2' if data2 else '1'}, length: {len(public_key_pem)}")
-            path_ending = Go2Connection.calc_local_path_ending(data1)
-            logger.debug(f"Calculated path ending: {path_ending}")
+    @staticmethod
+    def peer_offer_json(sdp_offer, token):
+        return json.dumps(
+            {
+                "id": "STA_localNetwork",
+                "sdp": sdp_offer.sdp,
+                "type": sdp_offer.type,
+                "token": token,
+            }
+        )
 
-            # Generate AES key
-            aes_key = Go2Connection.generate_aes_key()
+    @staticmethod
+    def prepare_con_ing(response_text, new_sdp, robot=None):
+        """Build the con_ing request from the con_notify response.
+
+        Returns (path_ending, body, headers, aes_key). `robot` identifies
+        the robot to the key cache.
+        """
+        logger.debug(f"Initial response: {response_text[:200]}...")
+        # Decode the response text from base64
+        decoded_response = base64.b64decode(response_text).decode("utf-8")
+        logger.debug(f"Decoded response: {decoded_response[:200]}...")
+
+        # Parse the decoded response as JSON
+        decoded_json = json.loads(decoded_response)
+        logger.debug(f"Decoded JSON keys: {decoded_json.keys()}")
+
+        # Extract both data1 and data2 fields
+        data1 = decoded_json.get("data1")
+        data2 = decoded_json.get("data2", "")
+        logger.debug(f"Data1 length: {len(data1)}, first 50 chars: {data1[:50]}")
+        logger.debug(f"Data2 type: {type(data2)}, value: {data2}")
+
+        # Try data2 as the public key first, then data1
+        public_key_pem = str(data2) if data2 and isinstance(data2, str) else data1[10 : len(data1) - 10]
+        logger.debug(f"Using key from data{'2' if data2 else '1'}, length: {len(public_key_pem)}")
+        path_ending = Go2Connection.calc_local_path_ending(data1)
+        logger.debug(f"Calculated path ending: {path_ending}")
+
+        # Generate AES key
+        aes_key = Go2Connection.generate_aes_key()
+
+        # Load and use the robot's actual RSA key for encryption
+        try:
+            public_key = Go2Connection.rsa_load_public_key(public_key_pem, robot)
+            logger.info(f"Successfully loaded robot's RSA key: {public_key.size_in_bits()} bits")
 
-            # Load and use the robot's actual RSA key for encryption
-            try:
-                public_key = Go2Connection.rsa_load_public_key(public_key_pem)
-                logger.info(f"Successfully loaded robot's RSA key: {public_key.size_in_bits()} bits")
-                
-                # Encrypt using robot's actual key
-                body = {
-                    "data1": Go2Connection.aes_encrypt(new_sdp, aes_key),
-                    "data2": Go2Connection.rsa_encrypt(aes_key, public_key),
-                }
-                logger.debug("Using robot's RSA key for encryption")
-            except Exception as e:
-                logger.error(f"Failed to use robot's key: {e}")
-                # Fallback to unencrypted
-                body = new_sdp
-                logger.debug("Fallback to unencrypted SDP")
-
-            # URL for the second request
-            url = f"http://{robot_ip}:9991/con_ing_{path_ending}"
-
-            # Set the appropriate headers for URL-encoded form data
-            headers = {"Content-Type": "application/x-www-form-urlencoded"}
-
-            # Send the data via POST
-            logger.debug(f"Sending data to: {url}")
-            if isinstance(body, str):
-                # Raw SDP
-                logger.debug(f"Sending raw SDP, length: {len(body)}")
-                response = Go2Connection.make_local_request(
-                    url, body=body, headers={"Content-Type": "text/plain"}
-                )
-            else:
-                # JSON encrypted data
-                logger.debug(f"Sending JSON body, length: {len(json.dumps(body))}")
-                response = Go2Connection.make_local_request(
-                    url, body=json.dumps(body), headers=headers
-                )
+            # Encrypt using robot's actual key
+            body = {
+                "data1": Go2Connection.aes_encrypt(new_sdp, aes_key),
+                "data2": Go2Connection.rsa_encrypt(aes_key, public_key),
+            }
+            logger.debug("Using robot's RSA key for encryption")
+        except Exception as e:
+            logger.error(f"Failed to use robot's key: {e}")
+            # Fallback to unencrypted
+            logger.debug("Fallback to unencrypted SDP")
+            logger.debug(f"Sending raw SDP, length: {len(new_sdp)}")
+            return path_ending, new_sdp, {"Content-Type": "text/plain"}, aes_key
 
-            # If response is successful, decrypt it
-            if response:
-                logger.debug(f"Got response: {response.status_code}, length: {len(response.text)}")
-                try:
-                    decrypted_response = Go2Connection.aes_decrypt(response.text, aes_key)
-                    peer_answer = json.loads(decrypted_response)
-                    logger.debug("Successfully decrypted response")
-                    return peer_answer
-                except Exception as e:
-                    logger.warning(f"Decryption failed: {e}, trying as plain JSON")
-                    try:
-                        peer_answer = json.loads(response.text)
-                        logger.debug("Response was plain JSON")
-                        return peer_answer
-                    except Exception as e2:
-                        logger.error(f"Both decryption and plain JSON failed: {e2}")
-                        logger.debug(f"Raw response: {response.text[:500]}")
-                        raise
-            else:
-                logger.error(f"No response from robot at {url}")
-                raise ValueError(f"Failed to get answer from server")
+        # JSON encrypted data, sent as URL-encoded form data
+        body = json.dumps(body)
+        logger.debug(f"Sending JSON body, length: {len(body)}")
+        return path_ending, body, {"Content-Type": "application/x-www-form-urlencoded"}, aes_key
 
-        else:
-            raise ValueError(
-                "Failed to receive initial public key response with new method."
-            )
+    @staticmethod
+    def parse_peer_answer(text, aes_key):
+        try:
+            decrypted_response = Go2Connection.aes_decrypt(text, aes_key)
+            peer_answer = json.loads(decrypted_response)
+            logger.debug("Successfully decrypted response")
+            return peer_answer
+        except Exception as e:
+            logger.warning(f"Decryption failed: {e}, trying as plain JSON")
+            try:
+                peer_answer = json.loads(text)
+                logger.debug("Response was plain JSON")
+                return peer_answer
+            except Exception as e2:
+                logger.error(f"Both decryption and plain JSON failed: {e2}")
+                logger.debug(f"Raw response: {text[:500]}")
+                raise
 
     @staticmethod
     def hex_to_base64(hex_str):
@@ -350,29 +620,11 @@ class Go2Connection:
 
     @staticmethod
     def generate_id():
-        return int(
-            datetime.datetime.now().timestamp() * 1000 % 2147483648
-        ) + random.randint(0, 999)
+        return next(request_ids) % 2147483648
 
     @staticmethod
     def deal_array_buffer(n):
-        # Unpack the first 2 bytes as an unsigned short (16-bit) to get the length
-        length = struct.unpack("H", n[:2])[0]
-
-        # Extract the JSON segment and the remaining data
-        json_segment = n[4 : 4 + length]
-        remaining_data = n[4 + length :]
-
-        # Decode the JSON segment from UTF-8 and parse it
-        json_str = json_segment.decode("utf-8")
-        obj = json.loads(json_str)
-
-        decoded_data = decoder.decode(remaining_data, obj["data"])
-
-        # Attach the remaining data to the object
-        obj["data"]["data"] = decoded_data
-
-        return obj
+        return deal_array_buffer(n, get_decoder())
 
     @staticmethod
     def calc_local_path_ending(data1):
@@ -415,126 +667,13 @@ class Go2Connection:
         return uuid_32_hex_string
 
     @staticmethod
-    def rsa_load_public_key(pem_data: str) -> RSA.RsaKey:
-        """Analyze and load RSA key from new firmware format."""
-        logger.debug(f"Key data length: {len(pem_data)}")
-        
-        try:
-            # Decode the base64 key
-            key_bytes = base64.b64decode(pem_data)
-            logger.debug(f"Decoded {len(key_bytes)} bytes")
-            logger.debug(f"First 20 bytes (hex): {key_bytes[:20].hex()}")
-            logger.debug(f"Last 20 bytes (hex): {key_bytes[-20:].hex()}")
-            
-            # Analyze the key structure
-            if len(key_bytes) == 426:
-                logger.debug("426-byte key detected - analyzing structure...")
-                
-                # Try different interpretations of the 426-byte structure
-                # Option 1: Skip first few bytes (might be header)
-                for skip in [0, 1, 2, 4, 8, 16, 32]:
-                    try:
-                        trimmed = key_bytes[skip:]
-                        key = RSA.import_key(trimmed)
-                        logger.info(f"Success with {skip} bytes skipped!")
-                        return key
-                    except:
-                        pass
-                
-                # Option 2: Robot's key might be in DER format with custom structure
-                # Try interpreting as ASN.1 DER without standard headers
-                try:
-                    # Look for RSA key pattern in the bytes
-                    # RSA keys often start with 0x30 (SEQUENCE) in DER format
-                    for offset in range(min(50, len(key_bytes))):
-                        try:
-                            test_key = key_bytes[offset:]
-                            if len(test_key) > 200:  # Reasonable key size
-                                key = RSA.import_key(test_key)
-                                logger.info(f"Success with DER offset {offset}! Key size: {key.size_in_bits()} bits")
-                                return key
-                        except:
-                            continue
-                except Exception as ex:
-                    logger.debug(f"DER parsing failed: {ex}")
-                
-                # Option 3: Try the key as raw PKCS#1 RSAPublicKey format
-                try:
-                    # Add PKCS#1 RSAPublicKey wrapper
-                    from Crypto.Util.asn1 import DerSequence, DerInteger
-                    
-                    # Try to parse as raw modulus + exponent
-                    if len(key_bytes) >= 384:
-                        # Split into modulus and exponent parts
-                        modulus_bytes = key_bytes[:384]  # 3072 bits = 384 bytes
-                        exponent_bytes = key_bytes[384:388]  # Try 4-byte exponent first
-                        
-                        n = int.from_bytes(modulus_bytes, 'big')
-                        e = int.from_bytes(exponent_bytes, 'big') if len(exponent_bytes) > 0 else 65537
-                        
-                        # Ensure reasonable exponent
-                        if e == 0 or e > 2**32:
-                            e = 65537
-                        
-                        # Create proper RSA key
-                        key = RSA.construct((n, e))
-                        logger.info(f"Success with PKCS#1 format! n={n.bit_length()} bits, e={e}")
-                        return key
-                except Exception as ex:
-                    logger.debug(f"PKCS#1 format failed: {ex}")
-                
-                # Option 4: Try different modulus/exponent splits
-                for mod_size in [256, 320, 384, 400]:
-                    try:
-                        modulus_bytes = key_bytes[:mod_size]
-                        exponent_bytes = key_bytes[mod_size:mod_size+4]  # Try 4-byte exponent
-                        
-                        n = int.from_bytes(modulus_bytes, 'big')
-                        e = int.from_bytes(exponent_bytes, 'big') if exponent_bytes else 65537
-                        
-                        if e > 0 and e < 2**32:  # Reasonable exponent range
-                            key = RSA.construct((n, e))
-                            logger.info(f"Success with {mod_size}-byte modulus! e={e}")
-                            return key
-                    except:
-                        pass
-            
-            # Standard format attempts
-            formats = [
-                key_bytes,
-                f"-----BEGIN PUBLIC KEY-----\n{pem_data}\n-----END PUBLIC KEY-----",
-                f"-----BEGIN RSA PUBLIC KEY-----\n{pem_data}\n-----END RSA PUBLIC KEY-----"
-            ]
-            
-            for i, fmt in enumerate(formats):
-                try:
-                    key = RSA.import_key(fmt)
-                    logger.info(f"Success with standard format {i}!")
-                    return key
-                except Exception as e:
-                    logger.debug(f"Standard format {i} failed: {e}")
-            
-        except Exception as e:
-            logger.error(f"Key analysis failed: {e}")
-        
-        # Last resort: Use the robot's modulus with standard exponent
-        try:
-            key_bytes = base64.b64decode(pem_data)
-            if len(key_bytes) >= 256:
-                # Use first 256 bytes as 2048-bit modulus
-                modulus_bytes = key_bytes[:256]
-                n = int.from_bytes(modulus_bytes, 'big')
-                e = 65537
-                key = RSA.construct((n, e))
-                logger.warning(f"Using robot's modulus with standard exponent: {n.bit_length()} bits")
-                return key
-        except:
-            pass
-            
-        # Final fallback
-        logger.error("All key parsing methods failed, using generated key")
-        key = RSA.generate(2048)
-        return key.publickey()
+    def rsa_load_public_key(pem_data: str, robot=None) -> RSA.RsaKey:
+        """Load the robot's RSA key, whatever the firmware's key format.
+
+        The parsed key is cached by fingerprint, and the parsing strategy
+        that worked is remembered for `robot`, see rsa_keys.
+        """
+        return get_resolver().load(pem_data, robot)
 
     @staticmethod
     def pad(data: str) -> bytes:
@@ -632,6 +771,32 @@ class Go2Connection:
                     
         return None
 
+    @staticmethod
+    async def make_local_request_async(session, path, body=None, headers=None, retries=3):
+        """Like make_local_request, returns the response text or None."""
+        for attempt in range(retries):
+            if attempt > 0:
+                delay = 2 ** attempt  # Exponential backoff
+                logger.debug(f"Waiting {delay}s before retry...")
+                await asyncio.sleep(delay)
+            try:
+                logger.debug(f"Making request to: {path} (attempt {attempt + 1})")
+                async with session.post(
+                    path, data=body, headers=headers, timeout=aiohttp.ClientTimeout(total=15)
+                ) as response:
+                    logger.debug(f"Response status: {response.status}")
+                    if response.status == 429:
+                        retry_after = response.headers.get("Retry-After", "")
+                        delay = float(retry_after) if retry_after.isdigit() else 5
+                        logger.warning(f"Rate limited, waiting {delay}s before retry...")
+                        await asyncio.sleep(delay)
+                        continue
+                    response.raise_for_status()
+                    return await response.text()
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                logger.error(f"Request failed (attempt {attempt + 1}): {e}")
+        return None
+
 
 # Example usage
 if __name__ == "__main__":
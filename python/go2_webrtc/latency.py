@@ -0,0 +1,231 @@
+# Copyright (c) 2024, RoboVerse community
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice, this
+#    list of conditions and the following disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+import asyncio
+import collections
+import datetime
+import logging
+import time
+
+import numpy as np
+
+from go2_webrtc.constants import DATA_CHANNEL_TYPE
+
+
+logger = logging.getLogger(__name__)
+
+
+class LatencyHistogram:
+    """Log-linear histogram of latencies, in the style of HdrHistogram.
+
+    Values are recorded in microseconds. Every power of two is split into
+    `sub_buckets` linear buckets, so percentiles are within
+    1 / sub_buckets of the true value up to `max_seconds`; larger values
+    go into the last bucket.
+    """
+
+    def __init__(self, sub_buckets=32, max_seconds=60.0):
+        self.sub_buckets = sub_buckets
+        self.sub_bits = sub_buckets.bit_length() - 1
+        if 1 << self.sub_bits != sub_buckets:
+            raise ValueError("sub_buckets must be a power of two")
+        self.counts = np.zeros(self.index(int(max_seconds * 1e6)) + 1, dtype=np.int64)
+        self.count = 0
+        self.total = 0
+        self.max = 0
+
+    def index(self, value):
+        if value < 2 * self.sub_buckets:
+            return value
+        shift = value.bit_length() - self.sub_bits - 1
+        return shift * self.sub_buckets + (value >> shift)
+
+    def lowest(self, index):
+        if index < 2 * self.sub_buckets:
+            return index
+        shift = index // self.sub_buckets - 1
+        return (index - shift * self.sub_buckets) << shift
+
+    def record(self, seconds):
+        value = max(int(seconds * 1e6), 0)
+        self.counts[min(self.index(value), len(self.counts) - 1)] += 1
+        self.count += 1
+        self.total += value
+        self.max = max(self.max, value)
+
+    def merge(self, other):
+        self.counts += other.counts
+        self.count += other.count
+        self.total += other.total
+        self.max = max(self.max, other.max)
+
+    def percentile(self, q):
+        """Return the q-th percentile in seconds, 0.0 when empty."""
+        if not self.count:
+            return 0.0
+        rank = max(int(np.ceil(q / 100 * self.count)), 1)
+        index = int(np.searchsorted(np.cumsum(self.counts), rank))
+        # Middle of the bucket, never above the largest recorded value
+        middle = (self.lowest(index) + self.lowest(index + 1) - 1) / 2
+        return min(middle, self.max) / 1e6
+
+    def summary(self):
+        return {
+            "count": self.count,
+            "mean_ms": self.total / self.count / 1e3 if self.count else 0.0,
+            "p50_ms": self.percentile(50) * 1e3,
+            "p90_ms": self.percentile(90) * 1e3,
+            "p99_ms": self.percentile(99) * 1e3,
+            "p999_ms": self.percentile(99.9) * 1e3,
+            "max_ms": self.max / 1e3,
+        }
+
+
+class RollingHistogram:
+    """Latency histograms over the last `window` seconds and since start.
+
+    The window is made of `slots` histograms that are dropped as they age,
+    so old samples leave the window without being tracked one by one.
+    """
+
+    def __init__(self, window=60.0, slots=6, clock=time.monotonic, **kwargs):
+        self.slot_seconds = window / slots
+        self.slots = collections.deque(maxlen=slots)
+        self.clock = clock
+        self.kwargs = kwargs
+        self.lifetime = LatencyHistogram(**kwargs)
+
+    def record(self, seconds):
+        slot = int(self.clock() // self.slot_seconds)
+        if not self.slots or self.slots[-1][0] != slot:
+            self.slots.append((slot, LatencyHistogram(**self.kwargs)))
+        self.slots[-1][1].record(seconds)
+        self.lifetime.record(seconds)
+
+    def window(self):
+        merged = LatencyHistogram(**self.kwargs)
+        oldest = int(self.clock() // self.slot_seconds) - self.slots.maxlen + 1
+        for slot, histogram in self.slots:
+            if slot >= oldest:
+                merged.merge(histogram)
+        return merged
+
+
+class LatencyProbe:
+    """Measure data channel round trips with heartbeat messages.
+
+    Sends a heartbeat every `interval` seconds, in the format of the
+    robot's own clients, and times the robot's echo. Heartbeats go through
+    the connection's send scheduler, so queueing delay is included. The
+    probe also records how late its own timer fires, which is the event
+    loop lag seen by every other callback.
+    """
+
+    def __init__(self, conn, interval=2.0, window=60.0):
+        self.conn = conn
+        self.interval = interval
+        self.rtt = RollingHistogram(window)
+        self.loop_lag = RollingHistogram(window)
+        # ((timeInStr, timeInNum), send time) of unanswered heartbeats, the
+        # key only has second resolution so it may repeat
+        self.outstanding = collections.deque(maxlen=16)
+        self.sent = 0
+        self.task = None
+
+    def start(self):
+        self.conn.latency_probe = self
+        if self.task is None:
+            self.task = asyncio.ensure_future(self.run())
+
+    def stop(self):
+        if self.conn.latency_probe is self:
+            self.conn.latency_probe = None
+        if self.task is not None:
+            self.task.cancel()
+            self.task = None
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        due = loop.time()
+        while True:
+            self.loop_lag.record(max(loop.time() - due, 0.0))
+            if self.conn.data_channel.readyState == "open":
+                self.send_heartbeat()
+            due += self.interval
+            await asyncio.sleep(max(due - loop.time(), 0.0))
+
+    def send_heartbeat(self):
+        now = datetime.datetime.now()
+        data = {
+            "timeInStr": now.strftime("%Y-%m-%d %H:%M:%S"),
+            "timeInNum": int(now.timestamp()),
+        }
+        # Echoes that never come back fall off the end of the deque
+        self.outstanding.append(((data["timeInStr"], data["timeInNum"]), time.perf_counter()))
+        self.conn.sender.send({"type": DATA_CHANNEL_TYPE["HEARTBEAT"], "data": data})
+        self.sent += 1
+
+    def on_heartbeat(self, msgobj):
+        if not self.outstanding:
+            return
+        data = msgobj.get("data")
+        key = None
+        if isinstance(data, dict):
+            key = (data.get("timeInStr"), data.get("timeInNum"))
+        # Oldest heartbeat with this key, or simply the oldest one when the
+        # echo carries no usable key
+        entry = next((entry for entry in self.outstanding if entry[0] == key), None)
+        if entry is None:
+            entry = self.outstanding[0]
+        self.outstanding.remove(entry)
+        self.rtt.record(time.perf_counter() - entry[1])
+
+    async def stats(self, transport=True):
+        """Return latency summaries, plus peer connection stats if `transport`."""
+        stats = {
+            "heartbeat_rtt": self.rtt.window().summary(),
+            "heartbeat_rtt_lifetime": self.rtt.lifetime.summary(),
+            "loop_lag": self.loop_lag.window().summary(),
+            "heartbeats_sent": self.sent,
+            "heartbeats_lost": max(self.sent - self.rtt.lifetime.count - len(self.outstanding), 0),
+        }
+        if transport:
+            stats["transport"] = await transport_stats(self.conn.pc)
+        return stats
+
+
+async def transport_stats(pc):
+    """Flatten RTCPeerConnection.getStats() and add the SCTP round trip time."""
+    report = await pc.getStats()
+    stats = {}
+    for key, value in report.items():
+        entry = {
+            name: getattr(value, name)
+            for name in vars(value)
+            if name not in ("id", "timestamp")
+        }
+        stats[key] = entry
+    # aiortc keeps the smoothed RTT privately, it is not part of getStats()
+    srtt = getattr(pc.sctp, "_srtt", None)
+    stats["sctp"] = {"srtt_ms": srtt * 1e3 if srtt is not None else None}
+    return stats
@@ -21,24 +21,100 @@
 
 import math
 import ctypes
+import hashlib
+import logging
 import numpy as np
 import os
+import struct
+import tempfile
 
-from wasmtime import Config, Engine, Store, Module, Instance, Func, FuncType
-from wasmtime import ValType
+from go2_webrtc import codec
+from go2_webrtc.cache import default_cache_dir
+from go2_webrtc.lidar_numpy import NumpyVoxelDecoder, copy_into, voxel_points
+
+
+logger = logging.getLogger(__name__)
+
+
+def wasmtime_version():
+    from importlib.metadata import PackageNotFoundError, version
+
+    try:
+        return version("wasmtime")
+    except PackageNotFoundError:
+        return "unknown"
+
+
+def load_module(engine, path, cache_dir=None):
+    """Compile the wasm module at `path`, reusing a serialized copy on disk.
+
+    Compiled artifacts are keyed by the wasm file hash and the wasmtime
+    version, so upgrading either one compiles and caches a fresh module.
+    `cache_dir=False` disables the cache.
+    """
+    from wasmtime import Module
+
+    with open(path, "rb") as f:
+        wasm = f.read()
+    if cache_dir is False:
+        return Module(engine, wasm)
+
+    cache_dir = cache_dir or default_cache_dir()
+    key = hashlib.sha256(wasm).hexdigest()[:16]
+    cache_path = os.path.join(
+        cache_dir, f"{os.path.basename(path)}-{key}-wasmtime-{wasmtime_version()}.bin"
+    )
+
+    if os.path.exists(cache_path):
+        try:
+            return Module.deserialize_file(engine, cache_path)
+        except Exception as e:
+            logger.warning("Ignoring unusable module cache %s: %s", cache_path, e)
+
+    module = Module(engine, wasm)
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        # Write to a temporary file first so readers never see a partial file
+        fd, tmp_path = tempfile.mkstemp(dir=cache_dir, suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            f.write(module.serialize())
+        os.replace(tmp_path, cache_path)
+    except OSError as e:
+        logger.debug("Could not write module cache %s: %s", cache_path, e)
+    return module
 
 
 class LidarDecoder:
-    def __init__(self) -> None:
+    """Decoder for rt/utlidar/voxel_map_compressed payloads.
+
+    `backend` selects the implementation: "wasm" runs the vendored
+    libvoxel.wasm through wasmtime, "numpy" is a vectorized NumPy port of
+    it that needs no wasm runtime. The compiled wasm module is cached in
+    `cache_dir` (see load_module).
+    """
+
+    def __init__(self, backend="wasm", cache_dir=None) -> None:
+        if backend not in ("wasm", "numpy"):
+            raise ValueError(f"Unknown lidar decoder backend: {backend}")
+        self.backend = backend
+        self.native = None
+        if backend == "numpy":
+            self.native = NumpyVoxelDecoder()
+            return
+
+        # Only the wasm backend needs wasmtime
+        from wasmtime import Config, Engine, Store, Instance, Func, FuncType
+        from wasmtime import ValType
 
         config = Config()
         config.wasm_multi_value = True
-        config.debug_info = True
         self.store = Store(Engine(config))
 
         module_dir = os.path.dirname(os.path.abspath(__file__))
 
-        self.module = Module.from_file(self.store.engine, os.path.join(module_dir,"libvoxel.wasm"))
+        self.module = load_module(
+            self.store.engine, os.path.join(module_dir, "libvoxel.wasm"), cache_dir
+        )
 
         self.a_callback_type = FuncType([ValType.i32()], [ValType.i32()])
         self.b_callback_type = FuncType([ValType.i32(), ValType.i32(), ValType.i32()], [])
@@ -53,6 +129,25 @@ class LidarDecoder:
         self.free = self.instance.exports(self.store)["g"]
         self.wasm_memory = self.instance.exports(self.store)["c"]
 
+        self.update_heap_views()
+
+        self.inputSize = 61440
+        self.input = self.malloc(self.store, self.inputSize)
+        self.decompressBuffer = self.malloc(self.store, 80000)
+        self.positions = self.malloc(self.store, 2880000)
+        self.uvs = self.malloc(self.store, 1920000)
+        self.indices = self.malloc(self.store, 5760000)
+        self.decompressedSize = self.malloc(self.store, 4)
+        self.faceCount = self.malloc(self.store, 4)
+        self.pointCount = self.malloc(self.store, 4)
+        self.decompressBufferSize = 80000
+
+    def update_heap_views(self):
+        """(Re)build the typed views over the wasm linear memory.
+
+        The views hold the raw address of the memory, so they have to be
+        rebuilt whenever the memory is grown and possibly moved.
+        """
         self.buffer = self.wasm_memory.data_ptr(self.store)
         self.memory_size = self.wasm_memory.data_len(self.store)
 
@@ -67,28 +162,47 @@ class LidarDecoder:
         self.HEAPF32 = (ctypes.c_float * (self.memory_size // 4)).from_address(self.buffer_ptr)
         self.HEAPF64 = (ctypes.c_double * (self.memory_size // 8)).from_address(self.buffer_ptr)
 
-        self.input = self.malloc(self.store, 61440)
-        self.decompressBuffer = self.malloc(self.store, 80000)
-        self.positions = self.malloc(self.store, 2880000)
-        self.uvs = self.malloc(self.store, 1920000)
-        self.indices = self.malloc(self.store, 5760000)
-        self.decompressedSize = self.malloc(self.store, 4)
-        self.faceCount = self.malloc(self.store, 4)
-        self.pointCount = self.malloc(self.store, 4)
-        self.decompressBufferSize = 80000
+        # NumPy view sharing the same memory, used to slice out results
+        # without materialising intermediate lists or bytearrays
+        self.heap = np.frombuffer(self.HEAPU8, dtype=np.uint8)
+
+    def check_heap_views(self):
+        if self.wasm_memory.data_len(self.store) != self.memory_size:
+            self.update_heap_views()
+
+    def heap_view(self, start, count, dtype=np.uint8):
+        """Return a NumPy array of `count` items aliasing wasm memory at `start`."""
+        dtype = np.dtype(dtype)
+        return self.heap[start:start + count * dtype.itemsize].view(dtype)
 
     def adjust_memory_size(self, t):
         return len(self.HEAPU8)
 
+    def check_range(self, start, count):
+        if start < 0 or count < 0 or start + count > self.memory_size:
+            raise ValueError(
+                f"Memory access out of bounds: [{start}, {start + count}) "
+                f"exceeds {self.memory_size} bytes"
+            )
+
+    def move_bytes(self, target, start, count):
+        """memmove `count` bytes inside wasm memory, overlapping ranges allowed."""
+        # Called back from inside generate, the memory may have grown since
+        self.check_heap_views()
+        self.check_range(start, count)
+        self.check_range(target, count)
+        ctypes.memmove(self.buffer_ptr + target, self.buffer_ptr + start, count)
+
+    def write_bytes(self, start, value):
+        """Copy a bytes-like object into wasm memory in a single operation."""
+        self.check_heap_views()
+        src = np.frombuffer(value, dtype=np.uint8)
+        self.check_range(start, src.size)
+        self.heap[start:start + src.size] = src
+
     def copy_within(self, target, start, end):
-        # Copy the sublist for the specified range [start:end]
-        sublist = self.HEAPU8[start:end]
-
-        # Replace elements in the list starting from index 'target'
-        for i in range(len(sublist)):
-            if target + i < len(self.HEAPU8):
-                self.HEAPU8[target + i] = sublist[i]
-    
+        self.move_bytes(target, start, end - start)
+
     def copy_memory_region(self, t, n, a):
         self.copy_within(t, n, n + a)
 
@@ -111,13 +225,35 @@ class LidarDecoder:
             raise ValueError(f"invalid type for getValue: {n}")
         
     def add_value_arr(self, start, value):
-        if start + len(value) <= len(self.HEAPU8):
-            for i, byte in enumerate(value):
-                self.HEAPU8[start + i] = byte
-        else:
-            raise ValueError("Not enough space to insert bytes at the specified index.")
+        self.write_bytes(start, value)
 
-    def decode(self, compressed_data, data):
+    def decode(self, compressed_data, data, zero_copy=False, out=None, mode="mesh"):
+        """Decode a compressed voxel map into mesh buffers.
+
+        By default the returned arrays are private copies. With
+        `zero_copy=True` they are views straight into the wasm memory and
+        are only valid until the next call to `decode`, or until the memory
+        grows and the heap views are rebuilt, since they do not keep the
+        memory alive. Alternatively `out`
+        can be a dict of preallocated "positions" (uint8), "uvs" (uint8) and
+        "indices" (uint32) arrays which are filled and returned sliced to
+        the decoded length.
+
+        With `mode="points"` no mesh is returned, only "point_count" and
+        "points", the occupied voxel centres as an (N, 3) float32 array in
+        world coordinates (`origin + (index + 0.5) * resolution`).
+        """
+        if mode not in ("mesh", "points"):
+            raise ValueError(f"Unknown decode mode: {mode}")
+        if self.native is not None:
+            return self.native.decode(compressed_data, data, zero_copy, out, mode)
+
+        self.check_heap_views()
+        if len(compressed_data) > self.inputSize:
+            raise ValueError(
+                f"Compressed payload of {len(compressed_data)} bytes exceeds "
+                f"the {self.inputSize} byte input buffer"
+            )
         self.add_value_arr(self.input, compressed_data)
 
         some_v = math.floor(data["origin"][2] / data["resolution"])
@@ -137,21 +273,36 @@ class LidarDecoder:
             some_v
         )
 
-        self.get_value(self.decompressedSize, "i32")
+        # Memory may have been grown by the module while generating
+        self.check_heap_views()
+
+        decompressed_size = self.get_value(self.decompressedSize, "i32")
         c = self.get_value(self.pointCount, "i32")
-        u = self.get_value(self.faceCount, "i32")
 
-        positions_slice = self.HEAPU8[self.positions:self.positions + u * 12]
-        positions_copy = bytearray(positions_slice)
-        p = np.frombuffer(positions_copy, dtype=np.uint8)
+        if mode == "points":
+            # The module always meshes, but the bitfield it decompressed is
+            # still in its buffer and is all that is needed for the centres
+            points = voxel_points(
+                self.heap_view(self.decompressBuffer, max(decompressed_size, 0)),
+                data["origin"],
+                data["resolution"],
+            )
+            return {"point_count": len(points), "points": points}
+
+        u = self.get_value(self.faceCount, "i32")
 
-        uvs_slice = self.HEAPU8[self.uvs:self.uvs + u * 8]
-        uvs_copy = bytearray(uvs_slice)
-        r = np.frombuffer(uvs_copy, dtype=np.uint8)
+        p = self.heap_view(self.positions, u * 12)
+        r = self.heap_view(self.uvs, u * 8)
+        o = self.heap_view(self.indices, u * 6, np.uint32)
 
-        indices_slice = self.HEAPU8[self.indices:self.indices + u * 24]
-        indices_copy = bytearray(indices_slice)
-        o = np.frombuffer(indices_copy, dtype=np.uint32)
+        if out is not None:
+            p = copy_into(out, "positions", p)
+            r = copy_into(out, "uvs", r)
+            o = copy_into(out, "indices", o)
+        elif not zero_copy:
+            p = p.copy()
+            r = r.copy()
+            o = o.copy()
 
         return {
             "point_count": c,
@@ -160,3 +311,23 @@ class LidarDecoder:
             "uvs": r,
             "indices": o
         }
+
+
+def deal_array_buffer(n, decoder, mode="mesh"):
+    """Split a binary data channel message and decode its voxel payload."""
+    # Unpack the first 2 bytes as an unsigned short (16-bit) to get the length
+    length = struct.unpack("H", n[:2])[0]
+
+    # Extract the JSON segment and the remaining data
+    json_segment = n[4 : 4 + length]
+    remaining_data = n[4 + length :]
+
+    # Parse the JSON segment, the codec takes UTF-8 bytes directly
+    obj = codec.loads(json_segment)
+
+    decoded_data = decoder.decode(remaining_data, obj["data"], mode=mode)
+
+    # Attach the remaining data to the object
+    obj["data"]["data"] = decoded_data
+
+    return obj
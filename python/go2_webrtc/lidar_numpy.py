@@ -0,0 +1,307 @@
+# Copyright (c) 2024, RoboVerse community
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice, this
+#    list of conditions and the following disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+# NumPy implementation of libvoxel.wasm.
+#
+# The payload of rt/utlidar/voxel_map_compressed is an LZ4 block holding an
+# occupancy bitfield of 128 x 128 voxels per layer, x fastest, most
+# significant bit first. Every occupied voxel emits one quad for each of its
+# six faces that is not hidden by an occupied neighbour.
+
+import logging
+import math
+
+import numpy as np
+
+
+logger = logging.getLogger(__name__)
+
+
+GRID_X = 128
+GRID_Y = 128
+# Layers above this index are treated as empty when checking neighbours
+GRID_Z_MAX = 29
+LAYER_BYTES = GRID_X * GRID_Y // 8
+
+DECOMPRESS_BUFFER_SIZE = 80000
+
+# Neighbour direction and quad corners of the six faces, in emission order
+FACE_DIRECTIONS = np.array(
+    [[-1, 0, 0], [1, 0, 0], [0, -1, 0], [0, 1, 0], [0, 0, -1], [0, 0, 1]],
+    dtype=np.int64,
+)
+FACE_CORNERS = np.array(
+    [
+        [[0, 1, 0], [0, 0, 0], [0, 1, 1], [0, 0, 1]],
+        [[1, 1, 1], [1, 0, 1], [1, 1, 0], [1, 0, 0]],
+        [[1, 0, 1], [0, 0, 1], [1, 0, 0], [0, 0, 0]],
+        [[0, 1, 1], [1, 1, 1], [0, 1, 0], [1, 1, 0]],
+        [[1, 0, 0], [0, 0, 0], [1, 1, 0], [0, 1, 0]],
+        [[0, 0, 1], [1, 0, 1], [0, 1, 1], [1, 1, 1]],
+    ],
+    dtype=np.int64,
+)
+QUAD_INDICES = np.array([0, 1, 2, 2, 1, 3], dtype=np.uint32)
+
+
+def lz4_block_decompress(src, capacity=DECOMPRESS_BUFFER_SIZE):
+    """Decompress a raw LZ4 block, raising ValueError on malformed input."""
+    src = bytes(src)
+    n = len(src)
+    dst = bytearray()
+    i = 0
+    while i < n:
+        token = src[i]
+        i += 1
+
+        literals = token >> 4
+        if literals == 15:
+            while True:
+                if i >= n:
+                    raise ValueError("Truncated literal length")
+                extra = src[i]
+                i += 1
+                literals += extra
+                if extra != 255:
+                    break
+        if i + literals > n:
+            raise ValueError("Literals run past the end of the block")
+        dst += src[i:i + literals]
+        i += literals
+
+        # The last sequence has no match part
+        if i >= n:
+            break
+
+        if i + 2 > n:
+            raise ValueError("Truncated match offset")
+        offset = src[i] | (src[i + 1] << 8)
+        i += 2
+        if offset == 0 or offset > len(dst):
+            raise ValueError(f"Invalid match offset {offset}")
+
+        length = token & 15
+        if length == 15:
+            while True:
+                if i >= n:
+                    raise ValueError("Truncated match length")
+                extra = src[i]
+                i += 1
+                length += extra
+                if extra != 255:
+                    break
+        length += 4
+
+        start = len(dst) - offset
+        if offset >= length:
+            dst += dst[start:start + length]
+        else:
+            # Overlapping match repeats the last `offset` bytes
+            pattern = dst[start:]
+            dst += (pattern * (length // offset + 1))[:length]
+
+        if len(dst) > capacity:
+            raise ValueError("Decompressed data exceeds the output buffer")
+
+    if len(dst) > capacity:
+        raise ValueError("Decompressed data exceeds the output buffer")
+    return dst
+
+
+def lz4_block_compress(raw):
+    """Greedy LZ4 block compressor, used to build synthetic voxel payloads."""
+    raw = bytes(raw)
+    n = len(raw)
+    out = bytearray()
+    table = {}
+    anchor = 0
+    i = 0
+
+    def emit_sequence(literals, offset=None, length=0):
+        lit_len = len(literals)
+        match_len = length - 4
+        token = min(lit_len, 15) << 4
+        if offset is not None:
+            token |= min(match_len, 15)
+        out.append(token)
+        write_length(lit_len)
+        out.extend(literals)
+        if offset is not None:
+            out.append(offset & 0xFF)
+            out.append(offset >> 8)
+            write_length(match_len)
+
+    def write_length(value):
+        if value < 15:
+            return
+        value -= 15
+        while value >= 255:
+            out.append(255)
+            value -= 255
+        out.append(value)
+
+    # The format requires the last match to start 12 bytes before the end
+    # and the last 5 bytes to be literals
+    limit = n - 12
+    while i < limit:
+        key = raw[i:i + 4]
+        candidate = table.get(key)
+        table[key] = i
+        if candidate is not None and i - candidate <= 0xFFFF:
+            length = 4
+            max_length = n - 5 - i
+            while length < max_length and raw[candidate + length] == raw[i + length]:
+                length += 1
+            emit_sequence(raw[anchor:i], i - candidate, length)
+            i += length
+            anchor = i
+        else:
+            i += 1
+    emit_sequence(raw[anchor:])
+    return bytes(out)
+
+
+def copy_into(out, name, src):
+    """Copy `src` into the preallocated array `out[name]` and return the slice."""
+    dst = out[name]
+    if dst.dtype != src.dtype:
+        raise ValueError(f"out[{name!r}] must have dtype {src.dtype}, got {dst.dtype}")
+    if dst.size < src.size:
+        raise ValueError(
+            f"out[{name!r}] too small: {dst.size} < {src.size} items"
+        )
+    dst = dst.reshape(-1)[:src.size]
+    np.copyto(dst, src)
+    return dst
+
+
+def unpack_voxels(decompressed):
+    """Return the occupancy bitfield as a (layers, 128, 128) bool array."""
+    raw = np.frombuffer(decompressed, dtype=np.uint8)
+    layers = -(-raw.size // LAYER_BYTES)
+    if raw.size != layers * LAYER_BYTES:
+        raw = np.concatenate([raw, np.zeros(layers * LAYER_BYTES - raw.size, np.uint8)])
+    return np.unpackbits(raw).reshape(layers, GRID_Y, GRID_X).view(bool)
+
+
+def mesh_voxels(grid, height_offset):
+    """Build the same positions/uvs/indices buffers as libvoxel.wasm."""
+    z, y, x = np.nonzero(grid)
+    voxels = np.stack([x, y, z], axis=1)
+
+    # Pad by one voxel on every side so neighbours can be looked up
+    # without bounds checks, out-of-grid neighbours read as empty
+    padded = np.zeros(
+        (max(grid.shape[0], GRID_Z_MAX + 1) + 2, GRID_Y + 2, GRID_X + 2), dtype=bool
+    )
+    padded[1:grid.shape[0] + 1, 1:-1, 1:-1] = grid
+    neighbours = voxels[:, None, :] + FACE_DIRECTIONS[None, :, :]
+    visible = ~padded[
+        neighbours[..., 2] + 1, neighbours[..., 1] + 1, neighbours[..., 0] + 1
+    ]
+    visible[:, 5] |= z + 1 > GRID_Z_MAX
+
+    face_voxel, face = np.nonzero(visible)
+    face_count = face_voxel.size
+
+    positions = (voxels[face_voxel, None, :] + FACE_CORNERS[face]).astype(np.uint8)
+
+    # Colour columns of the texture atlas, derived from the absolute height
+    # of the layer; the first layer keeps the module's initial values
+    shade = np.clip(z + height_offset, -10, 20) * 6
+    top = np.where(z == 0, 6, shade + 66)[face_voxel]
+    bottom = np.where(z == 0, 0, shade + 60)[face_voxel]
+    uvs = np.zeros((face_count, 8), dtype=np.int64)
+    uvs[:, 0] = uvs[:, 2] = top
+    uvs[:, 4] = uvs[:, 6] = bottom
+    uvs[:, 3] = uvs[:, 7] = 255
+
+    indices = (
+        np.arange(face_count, dtype=np.uint32)[:, None] * 4 + QUAD_INDICES[None, :]
+    )
+
+    return {
+        "point_count": int(z.size),
+        "face_count": int(face_count),
+        "positions": positions.reshape(-1),
+        "uvs": (uvs & 0xFF).astype(np.uint8).reshape(-1),
+        "indices": indices.reshape(-1),
+    }
+
+
+def occupied_cells(decompressed):
+    """Return the (x, y, z) indices of the set bits of the occupancy bitfield.
+
+    Only the nonzero bytes are unpacked, a frame is mostly empty space.
+    The cells come out in the same order as np.nonzero(unpack_voxels(...)).
+    """
+    raw = np.frombuffer(decompressed, dtype=np.uint8)
+    # nonzero is several times faster on flat bool arrays than on uint8
+    occupied = np.flatnonzero(raw != 0)
+    bits = np.flatnonzero(np.unpackbits(raw[occupied]).view(bool))
+    index = occupied[bits >> 3] * 8 + (bits & 7)
+    # The grid is 128 x 128 cells per layer
+    return index & (GRID_X - 1), (index >> 7) & (GRID_Y - 1), index >> 14
+
+
+def voxel_points(decompressed, origin, resolution):
+    """Return the centres of occupied voxels as (N, 3) float32 metres."""
+    cells = np.stack(occupied_cells(decompressed), axis=1).astype(np.float32)
+    return (cells + np.float32(0.5)) * np.float32(resolution) + np.asarray(
+        origin, dtype=np.float32
+    )
+
+
+class NumpyVoxelDecoder:
+    """Drop-in replacement for the wasm decoder written with NumPy."""
+
+    def __init__(self, decompress_buffer_size=DECOMPRESS_BUFFER_SIZE):
+        self.decompressBufferSize = decompress_buffer_size
+
+    def decompress(self, compressed_data):
+        try:
+            return lz4_block_decompress(compressed_data, self.decompressBufferSize)
+        except ValueError as e:
+            # The wasm module reports no geometry for broken payloads
+            logger.warning("Failed to decompress voxel map: %s", e)
+            return b""
+
+    def decode(self, compressed_data, data, zero_copy=False, out=None, mode="mesh"):
+        """Decode a compressed voxel map, see LidarDecoder.decode.
+
+        Results are always freshly allocated, so `zero_copy` is accepted for
+        compatibility only.
+        """
+        decompressed = self.decompress(compressed_data)
+        if mode == "points":
+            points = voxel_points(decompressed, data["origin"], data["resolution"])
+            return {"point_count": len(points), "points": points}
+
+        grid = unpack_voxels(decompressed)
+        result = mesh_voxels(grid, math.floor(data["origin"][2] / data["resolution"]))
+
+        if out is not None:
+            for name in ("positions", "uvs", "indices"):
+                result[name] = copy_into(out, name, result[name])
+
+        return result
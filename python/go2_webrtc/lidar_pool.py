@@ -0,0 +1,232 @@
+# Copyright (c) 2024, RoboVerse community
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice, this
+#    list of conditions and the following disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+import asyncio
+import collections
+import concurrent.futures
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures.process import BrokenProcessPool
+
+from go2_webrtc.lidar_decoder import LidarDecoder, deal_array_buffer
+
+
+logger = logging.getLogger(__name__)
+
+
+# Per-worker decoder, every worker process or thread owns its own wasmtime
+# Store/Instance
+worker_state = threading.local()
+
+POLICIES = ("drop-newest", "drop-oldest")
+
+
+def init_worker():
+    worker_state.decoder = LidarDecoder()
+
+
+def decode_in_worker(message, mode):
+    return deal_array_buffer(message, worker_state.decoder, mode)
+
+
+def make_executor(executor, workers):
+    """Create a "process" or "thread" executor of decode workers."""
+    if executor == "thread":
+        return concurrent.futures.ThreadPoolExecutor(
+            max_workers=workers, initializer=init_worker
+        )
+    # Forking a process that already runs wasmtime is not safe
+    return concurrent.futures.ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=init_worker,
+    )
+
+
+class LidarDecodePool:
+    """Decode binary data channel messages off the event loop.
+
+    Messages are decoded in a pool of worker processes, or threads with
+    `executor="thread"`. At most `max_pending` messages are queued or
+    being decoded at any time. Once full, the "drop-newest" policy rejects
+    new messages with asyncio.QueueFull, while "drop-oldest" discards the
+    oldest message that has not started decoding, so consumers always get
+    the latest frames. Both count the lost messages in `dropped`.
+
+    Results are handed to their callbacks in submission order, even when
+    workers finish out of order. `mode` is passed on to
+    LidarDecoder.decode.
+
+    `executor` may also be an executor from `make_executor` shared by
+    several pools, `workers` then caps how many of its workers this pool
+    occupies at once. A shared executor is left running by `shutdown`,
+    and when one of its workers dies `on_broken(executor)` is called so
+    its owner can replace it and reassign `executor` on every pool.
+    """
+
+    def __init__(
+        self,
+        workers=None,
+        max_pending=None,
+        mode="mesh",
+        executor="process",
+        policy="drop-newest",
+        on_broken=None,
+    ):
+        self.shared = isinstance(executor, concurrent.futures.Executor)
+        if not self.shared and executor not in ("process", "thread"):
+            raise ValueError(f"Unknown executor {executor!r}")
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown policy {policy!r}, expected one of {POLICIES}")
+        self.workers = workers or os.cpu_count() or 1
+        self.max_pending = max_pending or self.workers * 2
+        self.mode = mode
+        self.executor_type = None if self.shared else executor
+        self.policy = policy
+        self.on_broken = on_broken
+        self.executor = executor if self.shared else None
+        # Messages waiting for a free worker
+        self.waiting = collections.deque()
+        # Submitted messages, in order, until their result is delivered
+        self.pending = collections.deque()
+        self.running = 0
+        self.dropped = 0
+        self.space = None
+        self.idle = None
+
+    def start(self):
+        if self.executor is None:
+            self.executor = make_executor(self.executor_type, self.workers)
+
+    def shutdown(self, wait=True):
+        if self.shared:
+            for _, future, _, _ in self.pending:
+                future.cancel()
+        elif self.executor is not None:
+            self.executor.shutdown(wait=wait, cancel_futures=True)
+            self.executor = None
+        self.waiting.clear()
+        self.pending.clear()
+        self.running = 0
+
+    def qsize(self):
+        return len(self.waiting) + len(self.pending)
+
+    def full(self):
+        return self.qsize() >= self.max_pending
+
+    def put_nowait(self, message, callback):
+        """Queue `message`; `callback(message, msgobj)` runs once it is decoded.
+
+        Raises asyncio.QueueFull when the pool is full and the policy is
+        "drop-newest", and BrokenProcessPool (a RuntimeError) when a worker
+        died; the pool is then restarted on the next call.
+        """
+        if self.full():
+            if self.policy == "drop-oldest" and self.waiting:
+                self.waiting.popleft()
+                self.dropped += 1
+            else:
+                self.dropped += 1
+                raise asyncio.QueueFull()
+        self.start()
+        self.waiting.append((message, callback))
+        self.submit()
+
+    async def put(self, message, callback):
+        """Like put_nowait but waits for room in the queue."""
+        while self.full():
+            if self.space is None:
+                self.space = asyncio.Event()
+            self.space.clear()
+            await self.space.wait()
+        self.put_nowait(message, callback)
+
+    async def join(self):
+        """Wait until every queued message has been delivered."""
+        while self.qsize():
+            if self.idle is None:
+                self.idle = asyncio.Event()
+            self.idle.clear()
+            await self.idle.wait()
+
+    def submit(self):
+        loop = asyncio.get_running_loop()
+        while self.waiting and self.running < self.workers:
+            message, callback = self.waiting.popleft()
+            try:
+                submitted = self.executor.submit(decode_in_worker, message, self.mode)
+            except BrokenProcessPool:
+                logger.error("Decode worker died, restarting the pool")
+                self.dropped += len(self.waiting) + 1
+                self.waiting.clear()
+                self.executor_broken(self.executor)
+                raise
+            self.running += 1
+            future = asyncio.wrap_future(submitted, loop=loop)
+            self.pending.append((message, future, callback, self.executor))
+            future.add_done_callback(self.finished)
+
+    def executor_broken(self, executor):
+        # Results of a broken executor may arrive after it was replaced
+        if executor is not self.executor:
+            return
+        if self.shared:
+            # The owner of a shared executor has to replace it
+            if self.on_broken is not None:
+                self.on_broken(executor)
+        else:
+            executor.shutdown(wait=False, cancel_futures=True)
+            self.executor = None
+
+    def finished(self, future):
+        self.running -= 1
+        if self.executor is not None:
+            try:
+                self.submit()
+            except BrokenProcessPool:
+                pass
+        self.deliver()
+
+    def deliver(self):
+        # Only the oldest message may be delivered, later results wait for it
+        while self.pending and self.pending[0][1].done():
+            message, future, callback, executor = self.pending.popleft()
+            if future.cancelled():
+                continue
+            if future.exception() is not None:
+                logger.error("Failed to decode binary message: %s", future.exception())
+                if isinstance(future.exception(), BrokenProcessPool):
+                    self.executor_broken(executor)
+                continue
+            try:
+                callback(message, future.result())
+            except Exception as e:
+                logger.error("Decoded message callback failed: %s", e)
+
+        if self.space is not None and not self.full():
+            self.space.set()
+        if self.idle is not None and not self.qsize():
+            self.idle.set()
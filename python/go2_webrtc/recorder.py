@@ -0,0 +1,239 @@
+# Copyright (c) 2024, RoboVerse community
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice, this
+#    list of conditions and the following disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+# Recording of raw data channel traffic.
+#
+# A recording is a directory holding append-only segment files, one index
+# file per segment and a shared topic table:
+#
+#   segment-00000.g2rec  MAGIC, then records of RECORD_HEADER + payload
+#   segment-00000.idx    one INDEX_DTYPE entry per record
+#   topics.txt           topic names, the line number is the topic id
+#
+# Text payloads are stored UTF-8 encoded, binary payloads as received.
+
+import glob
+import logging
+import mmap
+import os
+import queue
+import struct
+import threading
+import time
+
+import numpy as np
+
+from go2_webrtc.framing import peek_topic
+
+
+logger = logging.getLogger(__name__)
+
+
+MAGIC = b"G2REC001"
+# stamp, payload length, topic id, kind
+RECORD_HEADER = struct.Struct("<dIHB")
+INDEX_ENTRY = struct.Struct("<dQHB")
+INDEX_DTYPE = np.dtype([("stamp", "<f8"), ("offset", "<u8"), ("topic", "<u2"), ("kind", "u1")])
+
+KIND_TEXT = 0
+KIND_BINARY = 1
+
+
+def segment_path(directory, number, suffix):
+    return os.path.join(directory, f"segment-{number:05d}.{suffix}")
+
+
+class StreamRecorder:
+    """Record raw data channel messages without blocking the caller.
+
+    `record` only timestamps the message and queues it. A writer thread
+    encodes the queued messages in batches, appends them to the current
+    segment and its index, and rotates to a new segment once
+    `segment_size` bytes are written. When more than `max_pending`
+    messages are waiting, new ones are dropped and counted in `dropped`.
+    """
+
+    def __init__(self, directory, segment_size=256 * 1024 * 1024, max_pending=10000):
+        self.directory = directory
+        self.segment_size = segment_size
+        self.queue = queue.Queue(maxsize=max_pending)
+        self.dropped = 0
+        self.recorded = 0
+
+        os.makedirs(directory, exist_ok=True)
+        self.topics = {}
+        topics_path = os.path.join(directory, "topics.txt")
+        if os.path.exists(topics_path):
+            with open(topics_path, encoding="utf-8") as f:
+                for line in f:
+                    self.topics[line.rstrip("\n")] = len(self.topics)
+        self.topics_file = open(topics_path, "a", encoding="utf-8")
+
+        # Appending to an existing recording starts a new segment
+        self.segment_number = len(glob.glob(os.path.join(directory, "segment-*.g2rec")))
+        self.segment = None
+        self.index = None
+        self.offset = 0
+
+        self.thread = threading.Thread(target=self.run, name="go2-recorder", daemon=True)
+        self.thread.start()
+
+    def record(self, message, stamp=None):
+        try:
+            self.queue.put_nowait((time.time() if stamp is None else stamp, message))
+        except queue.Full:
+            self.dropped += 1
+
+    def close(self):
+        """Write everything queued so far and stop the writer thread."""
+        if self.thread.is_alive():
+            self.queue.put(None)
+            self.thread.join()
+
+    def run(self):
+        running = True
+        while running:
+            batch = [self.queue.get()]
+            # Take whatever else is already waiting, one write per batch
+            try:
+                while len(batch) < 1000:
+                    batch.append(self.queue.get_nowait())
+            except queue.Empty:
+                pass
+            if None in batch:
+                batch = batch[: batch.index(None)]
+                running = False
+            try:
+                self.write_batch(batch)
+            except OSError as e:
+                logger.error("Failed to write recording: %s", e)
+        self.close_segment()
+        self.topics_file.close()
+
+    def topic_id(self, topic):
+        topic_id = self.topics.get(topic)
+        if topic_id is None:
+            topic_id = self.topics[topic] = len(self.topics)
+            self.topics_file.write(topic + "\n")
+            self.topics_file.flush()
+        return topic_id
+
+    def write_batch(self, batch):
+        records = []
+        entries = []
+        for stamp, message in batch:
+            if isinstance(message, str):
+                kind, payload = KIND_TEXT, message.encode("utf-8")
+            else:
+                kind, payload = KIND_BINARY, bytes(message)
+            topic_id = self.topic_id(peek_topic(message))
+            size = RECORD_HEADER.size + len(payload)
+
+            if self.segment is None or (
+                self.offset > len(MAGIC) and self.offset + size > self.segment_size
+            ):
+                self.flush(records, entries)
+                self.open_segment()
+
+            entries.append(INDEX_ENTRY.pack(stamp, self.offset, topic_id, kind))
+            records.append(RECORD_HEADER.pack(stamp, len(payload), topic_id, kind))
+            records.append(payload)
+            self.offset += size
+        self.flush(records, entries)
+        self.recorded += len(batch)
+
+    def flush(self, records, entries):
+        if records:
+            self.segment.write(b"".join(records))
+            self.index.write(b"".join(entries))
+            self.segment.flush()
+            self.index.flush()
+            records.clear()
+            entries.clear()
+
+    def open_segment(self):
+        self.close_segment()
+        self.segment = open(segment_path(self.directory, self.segment_number, "g2rec"), "wb")
+        self.index = open(segment_path(self.directory, self.segment_number, "idx"), "wb")
+        self.segment_number += 1
+        self.segment.write(MAGIC)
+        self.offset = len(MAGIC)
+
+    def close_segment(self):
+        if self.segment is not None:
+            self.segment.close()
+            self.index.close()
+            self.segment = None
+            self.index = None
+
+
+class StreamReader:
+    """Read a recording made by StreamRecorder, using the memory-mapped index."""
+
+    def __init__(self, directory):
+        self.directory = directory
+        with open(os.path.join(directory, "topics.txt"), encoding="utf-8") as f:
+            self.topics = [line.rstrip("\n") for line in f]
+        self.segments = sorted(glob.glob(os.path.join(directory, "segment-*.g2rec")))
+
+    def index(self, segment):
+        path = segment[: -len(".g2rec")] + ".idx"
+        if os.path.getsize(path) < INDEX_DTYPE.itemsize:
+            return np.empty(0, dtype=INDEX_DTYPE)
+        return np.memmap(path, dtype=INDEX_DTYPE, mode="r")
+
+    def select(self, index, topics=None, start=None, end=None):
+        mask = np.ones(len(index), dtype=bool)
+        if topics is not None:
+            topics = set(topics)
+            ids = [i for i, topic in enumerate(self.topics) if topic in topics]
+            mask &= np.isin(index["topic"], ids)
+        if start is not None:
+            mask &= index["stamp"] >= start
+        if end is not None:
+            mask &= index["stamp"] < end
+        return index[mask]
+
+    def messages(self, topics=None, start=None, end=None):
+        """Yield (stamp, topic, message) in recording order.
+
+        Messages are str or bytes, exactly as they were received.
+        """
+        for segment in self.segments:
+            entries = self.select(self.index(segment), topics, start, end)
+            if not len(entries):
+                continue
+            with open(segment, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                for stamp, offset, topic_id, kind in entries.tolist():
+                    _, length, _, _ = RECORD_HEADER.unpack_from(data, offset)
+                    start_payload = offset + RECORD_HEADER.size
+                    payload = data[start_payload : start_payload + length]
+                    message = payload.decode("utf-8") if kind == KIND_TEXT else payload
+                    yield stamp, self.topics[topic_id], message
+
+    def stats(self):
+        """Return the number of recorded messages per topic."""
+        counts = np.zeros(len(self.topics), dtype=np.int64)
+        for segment in self.segments:
+            counts += np.bincount(self.index(segment)["topic"], minlength=len(self.topics))
+        return dict(zip(self.topics, counts.tolist()))
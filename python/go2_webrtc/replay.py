@@ -0,0 +1,121 @@
+# Copyright (c) 2024, RoboVerse community
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice, this
+#    list of conditions and the following disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+import asyncio
+import logging
+import time
+
+from go2_webrtc import codec
+from go2_webrtc.lidar_decoder import LidarDecoder, deal_array_buffer
+from go2_webrtc.recorder import StreamReader
+
+
+logger = logging.getLogger(__name__)
+
+
+class StreamReplay:
+    """Feed a recording to `on_message(message, msgobj)` like Go2Connection.
+
+    `speed` scales the recorded timing: 1.0 replays in real time, 2.0 twice
+    as fast, and None as fast as the consumer keeps up. Binary messages are
+    decoded with `decoder`, or through `decode_pool` when one is given, in
+    which case the replay waits for room in the pool instead of dropping.
+    """
+
+    def __init__(
+        self,
+        directory,
+        on_message=None,
+        speed=1.0,
+        topics=None,
+        start=None,
+        end=None,
+        decoder=None,
+        decode_pool=None,
+        mode="mesh",
+    ):
+        if speed is not None and speed <= 0:
+            raise ValueError("speed must be positive or None")
+        self.reader = StreamReader(directory)
+        self.on_message = on_message
+        self.speed = speed
+        self.topics = topics
+        self.start = start
+        self.end = end
+        self.decoder = decoder
+        self.decode_pool = decode_pool
+        self.mode = mode
+
+        self.count = 0
+        # Worst delay between a message's scheduled and actual delivery
+        self.max_lag = 0.0
+
+    def parse(self, message):
+        if isinstance(message, str):
+            return codec.loads(message)
+        if self.decoder is None:
+            self.decoder = LidarDecoder()
+        return deal_array_buffer(message, self.decoder, self.mode)
+
+    async def run(self):
+        """Replay all selected messages, returns the number delivered."""
+        loop = asyncio.get_running_loop()
+        first = None
+        started = loop.time()
+
+        for stamp, _, message in self.reader.messages(self.topics, self.start, self.end):
+            if first is None:
+                first = stamp
+            if self.speed is not None:
+                due = started + (stamp - first) / self.speed
+                delay = due - loop.time()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                else:
+                    self.max_lag = max(self.max_lag, -delay)
+            elif self.count % 100 == 0:
+                # Let other tasks run even when replaying flat out
+                await asyncio.sleep(0)
+
+            self.count += 1
+            if not self.on_message:
+                continue
+            if isinstance(message, bytes) and self.decode_pool:
+                await self.decode_pool.put(message, self.on_message)
+                continue
+            try:
+                msgobj = self.parse(message)
+            except codec.DecodeError:
+                continue
+            self.on_message(message, msgobj)
+
+        if self.decode_pool:
+            await self.decode_pool.join()
+        return self.count
+
+    def replay(self):
+        """Run the replay to completion from synchronous code."""
+        began = time.perf_counter()
+        count = asyncio.run(self.run())
+        logger.info("Replayed %d messages in %.3fs", count, time.perf_counter() - began)
+        return count
@@ -0,0 +1,88 @@
+# Copyright (c) 2024, RoboVerse community
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice, this
+#    list of conditions and the following disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+import logging
+
+
+logger = logging.getLogger(__name__)
+
+
+class TopicRouter:
+    """Dispatch data channel messages to handlers registered per topic.
+
+    Handlers are called as `handler(message, msgobj)`, for an exact topic
+    or for every topic starting with a prefix. Go2Connection asks `wants`
+    before parsing a message, so topics without a handler are never
+    parsed or decoded. Messages without a topic (validation, errors) are
+    always wanted.
+    """
+
+    def __init__(self):
+        self.exact = {}
+        self.prefixes = []
+        # topic -> handlers, rebuilt whenever the routes change
+        self.cache = {}
+
+    def add(self, topic, handler, prefix=False):
+        if prefix:
+            self.prefixes.append((topic, handler))
+        else:
+            self.exact.setdefault(topic, []).append(handler)
+        self.cache.clear()
+
+    def remove(self, topic, handler, prefix=False):
+        if prefix:
+            self.prefixes.remove((topic, handler))
+        else:
+            self.exact[topic].remove(handler)
+            if not self.exact[topic]:
+                del self.exact[topic]
+        self.cache.clear()
+
+    def route(self, topic, prefix=False):
+        """Decorator form of `add`."""
+
+        def register(handler):
+            self.add(topic, handler, prefix)
+            return handler
+
+        return register
+
+    def handlers(self, topic):
+        handlers = self.cache.get(topic)
+        if handlers is None:
+            handlers = tuple(self.exact.get(topic, ())) + tuple(
+                handler for prefix, handler in self.prefixes if topic.startswith(prefix)
+            )
+            self.cache[topic] = handlers
+        return handlers
+
+    def wants(self, topic):
+        return not topic or bool(self.handlers(topic))
+
+    def dispatch(self, message, msgobj):
+        for handler in self.handlers(msgobj.get("topic") or ""):
+            try:
+                handler(message, msgobj)
+            except Exception as e:
+                logger.error("Handler for %s failed: %s", msgobj.get("topic"), e)
@@ -0,0 +1,213 @@
+# Copyright (c) 2024, RoboVerse community
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice, this
+#    list of conditions and the following disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+# Parsing of the public key the robot sends during signaling.
+#
+# Depending on the firmware the key arrives in different encodings, so a
+# list of parsing strategies is tried in turn. The strategy that worked is
+# remembered per robot and key format, and the parsed key is cached by the
+# fingerprint of the encoded key, in memory and on disk.
+
+import base64
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+
+from Crypto.PublicKey import RSA
+
+from go2_webrtc.cache import default_cache_dir
+
+
+logger = logging.getLogger(__name__)
+
+
+# Never cached: the robot cannot decrypt anything sent with this key
+GENERATED = "generated"
+
+
+def candidate_strategies(key_bytes):
+    """Return the strategy names to try for `key_bytes`, in order."""
+    strategies = []
+    if len(key_bytes) == 426:
+        strategies += [f"skip:{skip}" for skip in (0, 1, 2, 4, 8, 16, 32)]
+        strategies += [f"der:{offset}" for offset in range(min(50, len(key_bytes)))]
+        strategies += ["pkcs1"]
+        strategies += [f"modulus:{size}" for size in (256, 320, 384, 400)]
+    strategies += ["standard:0", "standard:1", "standard:2", "modulus-f4"]
+    return strategies
+
+
+def parse_with(strategy, pem_data, key_bytes):
+    """Parse the key with one strategy, raising on failure."""
+    kind, _, arg = strategy.partition(":")
+    if kind == "skip":
+        return RSA.import_key(key_bytes[int(arg):])
+    if kind == "der":
+        test_key = key_bytes[int(arg):]
+        if len(test_key) <= 200:  # Reasonable key size
+            raise ValueError("Too short for a key")
+        return RSA.import_key(test_key)
+    if kind == "pkcs1":
+        # Raw 3072-bit modulus followed by a 4-byte exponent
+        if len(key_bytes) < 384:
+            raise ValueError("Too short for a 3072-bit modulus")
+        n = int.from_bytes(key_bytes[:384], "big")
+        exponent_bytes = key_bytes[384:388]
+        e = int.from_bytes(exponent_bytes, "big") if exponent_bytes else 65537
+        if e == 0 or e > 2**32:
+            e = 65537
+        return RSA.construct((n, e))
+    if kind == "modulus":
+        size = int(arg)
+        exponent_bytes = key_bytes[size:size + 4]
+        n = int.from_bytes(key_bytes[:size], "big")
+        e = int.from_bytes(exponent_bytes, "big") if exponent_bytes else 65537
+        if not 0 < e < 2**32:  # Reasonable exponent range
+            raise ValueError(f"Unreasonable exponent {e}")
+        return RSA.construct((n, e))
+    if kind == "standard":
+        formats = [
+            key_bytes,
+            f"-----BEGIN PUBLIC KEY-----\n{pem_data}\n-----END PUBLIC KEY-----",
+            f"-----BEGIN RSA PUBLIC KEY-----\n{pem_data}\n-----END RSA PUBLIC KEY-----",
+        ]
+        return RSA.import_key(formats[int(arg)])
+    if kind == "modulus-f4":
+        # Last resort: the robot's modulus with the standard exponent
+        if len(key_bytes) < 256:
+            raise ValueError("Too short for a 2048-bit modulus")
+        return RSA.construct((int.from_bytes(key_bytes[:256], "big"), 65537))
+    raise ValueError(f"Unknown key strategy {strategy!r}")
+
+
+def fingerprint(pem_data):
+    return hashlib.sha256(pem_data.encode("utf-8")).hexdigest()[:32]
+
+
+class PublicKeyResolver:
+    """Parse robot public keys, remembering what worked.
+
+    Parsed keys are cached by fingerprint in memory and as files under
+    `cache_dir`, so a reconnect to the same robot imports the stored key
+    directly. The working strategy is remembered per robot and key
+    length, which tells firmware key formats apart, and is tried first
+    for new keys. `cache_dir=False` keeps the caches in memory only.
+    """
+
+    def __init__(self, cache_dir=None):
+        if cache_dir is None:
+            cache_dir = os.path.join(default_cache_dir(), "rsa_keys")
+        self.cache_dir = cache_dir
+        self.keys = {}
+        self.strategies = {}
+        # Keys are parsed in executor threads by the async signaling path
+        self.lock = threading.Lock()
+        if cache_dir:
+            self.strategies = self.read_json("strategies.json") or {}
+
+    def load(self, pem_data, robot=None):
+        key_id = fingerprint(pem_data)
+        with self.lock:
+            key = self.keys.get(key_id)
+        if key is not None:
+            return key
+
+        cached = self.read_json(f"{key_id}.json") if self.cache_dir else None
+        if cached is not None:
+            try:
+                key = RSA.import_key(base64.b64decode(cached["key"]))
+                logger.debug("Using cached key %s, parsed with %s", key_id, cached["strategy"])
+                with self.lock:
+                    self.keys[key_id] = key
+                return key
+            except (KeyError, ValueError, TypeError) as e:
+                logger.warning("Ignoring unusable key cache %s: %s", key_id, e)
+
+        key_bytes = base64.b64decode(pem_data)
+        logger.debug(f"Key data length: {len(pem_data)}, decoded {len(key_bytes)} bytes")
+        format_id = f"{robot}/{len(key_bytes)}"
+        strategy, key = self.parse(pem_data, key_bytes, self.strategies.get(format_id))
+        if strategy == GENERATED:
+            return key
+
+        with self.lock:
+            self.keys[key_id] = key
+            self.strategies[format_id] = strategy
+        if self.cache_dir:
+            self.write_json(
+                f"{key_id}.json",
+                {
+                    "strategy": strategy,
+                    "key": base64.b64encode(key.export_key("DER")).decode("ascii"),
+                },
+            )
+            self.write_json("strategies.json", self.strategies)
+        return key
+
+    def parse(self, pem_data, key_bytes, preferred=None):
+        strategies = candidate_strategies(key_bytes)
+        if preferred in strategies:
+            strategies.remove(preferred)
+            strategies.insert(0, preferred)
+        for strategy in strategies:
+            try:
+                key = parse_with(strategy, pem_data, key_bytes)
+            except Exception:
+                continue
+            logger.info(f"Parsed robot key with {strategy}: {key.size_in_bits()} bits")
+            return strategy, key
+
+        # Final fallback
+        logger.error("All key parsing methods failed, using generated key")
+        return GENERATED, RSA.generate(2048).publickey()
+
+    def read_json(self, name):
+        try:
+            with open(os.path.join(self.cache_dir, name)) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def write_json(self, name, value):
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            # Write to a temporary file first so readers never see a partial file
+            fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+            with os.fdopen(fd, "w") as f:
+                json.dump(value, f)
+            os.replace(tmp_path, os.path.join(self.cache_dir, name))
+        except OSError as e:
+            logger.debug("Could not write key cache %s: %s", name, e)
+
+
+resolver = None
+
+
+def get_resolver():
+    global resolver
+    if resolver is None:
+        resolver = PublicKeyResolver()
+    return resolver
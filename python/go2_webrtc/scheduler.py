@@ -0,0 +1,124 @@
+# Copyright (c) 2024, RoboVerse community
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice, this
+#    list of conditions and the following disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+import collections
+import logging
+
+from go2_webrtc import codec
+from go2_webrtc.constants import ROBOT_CMD, RTC_TOPIC
+
+
+logger = logging.getLogger(__name__)
+
+
+# Only the latest of these is worth sending, older ones are superseded
+COALESCED_API_IDS = {ROBOT_CMD["Move"], ROBOT_CMD["Euler"]}
+# Safety commands, sent ahead of everything else
+URGENT_API_IDS = {ROBOT_CMD["StopMove"], ROBOT_CMD["Damp"]}
+
+
+def sport_api_id(payload):
+    if payload.get("topic") != RTC_TOPIC["SPORT_MOD"]:
+        return None
+    try:
+        return payload["data"]["header"]["identity"]["api_id"]
+    except (KeyError, TypeError):
+        return None
+
+
+class SendScheduler:
+    """Outbound queue for a data channel that respects its send buffer.
+
+    Messages are written to the channel while its `bufferedAmount` is
+    below `high`, and queued otherwise until the buffer drains below `low`
+    and the channel emits "bufferedamountlow". Queued sport commands that
+    only set a target, like Move, are coalesced: a newer one replaces the
+    queued one, keeping its place. StopMove and Damp skip the queue and
+    discard any queued motion commands.
+
+    Payloads are dicts, encoded only when they are actually sent.
+    """
+
+    def __init__(self, channel, low=64 * 1024, high=256 * 1024):
+        self.channel = channel
+        self.low = low
+        self.high = high
+        # Entries are [key, payload] so coalescing can replace the payload
+        self.queue = collections.deque()
+        self.coalesced = {}
+        self.sent = 0
+        self.superseded = 0
+
+        channel.bufferedAmountLowThreshold = low
+        channel.on("bufferedamountlow", self.flush)
+
+    def __len__(self):
+        return len(self.queue)
+
+    def send(self, payload):
+        if self.channel.readyState != "open":
+            logger.error("Data channel is not open. State is %s", self.channel.readyState)
+            return
+
+        api_id = sport_api_id(payload)
+        if api_id in URGENT_API_IDS:
+            self.drop_motion()
+            self.write(payload)
+            return
+
+        if api_id in COALESCED_API_IDS:
+            key = (payload["topic"], api_id)
+            entry = self.coalesced.get(key)
+            if entry is not None:
+                entry[1] = payload
+                self.superseded += 1
+                return
+            entry = [key, payload]
+            self.coalesced[key] = entry
+        else:
+            entry = [None, payload]
+        self.queue.append(entry)
+        self.flush()
+
+    def flush(self):
+        queue = self.queue
+        while queue and self.channel.bufferedAmount < self.high:
+            key, payload = queue.popleft()
+            if key is not None:
+                del self.coalesced[key]
+            self.write(payload)
+
+    def write(self, payload):
+        if self.channel.readyState != "open":
+            return
+        message = codec.dumps(payload)
+        logger.debug("-> Sending message %s", message)
+        self.channel.send(message)
+        self.sent += 1
+
+    def drop_motion(self):
+        if not self.coalesced:
+            return
+        self.queue = collections.deque(entry for entry in self.queue if entry[0] is None)
+        self.superseded += len(self.coalesced)
+        self.coalesced.clear()
@@ -0,0 +1,233 @@
+# Copyright (c) 2024, RoboVerse community
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice, this
+#    list of conditions and the following disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+import asyncio
+import logging
+import random
+
+from go2_webrtc.go2_connection import Go2Connection
+
+
+logger = logging.getLogger(__name__)
+
+
+class ConnectionSupervisor:
+    """Keep a validated Go2Connection to the robot, reconnecting on failure.
+
+    A failed or closed peer connection, or no message for `silence_timeout`
+    seconds, starts a reconnect. A standby connection with its offer
+    already generated is kept ready, so reconnecting only costs the
+    signaling round trip. Failed attempts are retried after an exponential
+    backoff from `backoff` up to `max_backoff` seconds, with jitter.
+    Subscriptions and conflated topics made through the supervisor, and
+    topics subscribed directly on the lost connection, are restored on
+    every new connection before `on_validated` is called.
+
+    `signaling` picks Go2Connection.connect_robot_v10 or _v11, other
+    keyword arguments are passed to every Go2Connection.
+    """
+
+    def __init__(
+        self,
+        ip=None,
+        token="",
+        signaling="v10",
+        backoff=0.25,
+        max_backoff=10.0,
+        validate_timeout=10.0,
+        silence_timeout=None,
+        on_validated=None,
+        **options,
+    ):
+        if signaling not in ("v10", "v11"):
+            raise ValueError(f"Unknown signaling {signaling!r}")
+        self.ip = ip
+        self.token = token
+        self.signaling = signaling
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.validate_timeout = validate_timeout
+        self.silence_timeout = silence_timeout
+        self.on_validated = on_validated
+        self.options = options
+
+        # The current validated connection, None while reconnecting
+        self.conn = None
+        self.connected = asyncio.Event()
+        self.standby = None
+        self.subscriptions = {}
+        # Subscriptions of the lost connection, restored with the above
+        self.carried = {}
+        # topic -> [(callback, rate)], callback None for latest() only
+        self.conflated = {}
+        self.task = None
+
+        self.reconnects = 0
+        # Seconds from losing the previous connection to validating the
+        # current one
+        self.last_recovery = None
+        self.last_message = 0.0
+
+    def subscribe(self, topic):
+        self.subscriptions[topic] = None
+        if self.conn is not None:
+            self.conn.subscribe(topic)
+
+    def unsubscribe(self, topic):
+        self.subscriptions.pop(topic, None)
+        self.carried.pop(topic, None)
+        if self.conn is not None:
+            self.conn.unsubscribe(topic)
+
+    def conflate(self, topic, callback=None, rate=None):
+        """Go2Connection.conflate, kept across reconnects."""
+        self.conflated.setdefault(topic, []).append((callback, rate))
+        if self.conn is not None:
+            self.conn.conflate(topic, callback, rate)
+
+    def start(self):
+        if self.task is None or self.task.done():
+            self.task = asyncio.ensure_future(self.run())
+        return self.task
+
+    async def stop(self):
+        if self.task is not None:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+            self.task = None
+
+    async def prepare(self):
+        """Build a connection and generate its offer, ready to signal."""
+        conn = Go2Connection(self.ip, self.token, **self.options)
+        await conn.generate_offer()
+        return conn
+
+    def delay(self, attempt):
+        base = min(self.max_backoff, self.backoff * 2 ** (attempt - 1))
+        # Spread the retries of many clients over the robot's rate limit
+        return random.uniform(base / 2, base)
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        self.standby = asyncio.ensure_future(self.prepare())
+        attempt = 0
+        lost_at = None
+        try:
+            while True:
+                conn = await self.standby
+                self.standby = asyncio.ensure_future(self.prepare())
+                try:
+                    lost = await self.connect(conn)
+                except Exception as e:
+                    await conn.close()
+                    attempt += 1
+                    delay = self.delay(attempt)
+                    logger.warning(
+                        "Connecting to %s failed (%s), retrying in %.2fs", self.ip, e, delay
+                    )
+                    await asyncio.sleep(delay)
+                    continue
+
+                attempt = 0
+                if lost_at is not None:
+                    self.reconnects += 1
+                    self.last_recovery = loop.time() - lost_at
+                    logger.info("Reconnected to %s in %.2fs", self.ip, self.last_recovery)
+                await self.watch(lost)
+
+                lost_at = loop.time()
+                self.carried = dict(conn.subscriptions)
+                logger.warning("Connection to %s lost, reconnecting", self.ip)
+                self.conn = None
+                self.connected.clear()
+                await conn.close()
+        finally:
+            self.connected.clear()
+            if self.conn is not None:
+                await self.conn.close()
+                self.conn = None
+            self.standby.cancel()
+            try:
+                await (await self.standby).close()
+            except (asyncio.CancelledError, Exception):
+                pass
+
+    async def connect(self, conn):
+        """Signal, wait for validation and restore the subscriptions.
+
+        Returns a future that completes when the connection is lost.
+        """
+        loop = asyncio.get_running_loop()
+        validated = loop.create_future()
+        lost = loop.create_future()
+
+        def on_validated():
+            if not validated.done():
+                validated.set_result(True)
+
+        def on_state():
+            if conn.pc.connectionState in ("failed", "closed") and not lost.done():
+                lost.set_result(conn.pc.connectionState)
+                if not validated.done():
+                    validated.set_exception(ConnectionError("Peer connection failed"))
+
+        def on_message(message):
+            self.last_message = loop.time()
+
+        conn.on_validated = on_validated
+        conn.pc.on("connectionstatechange", on_state)
+        conn.data_channel.on("message", on_message)
+
+        try:
+            await getattr(conn, f"connect_robot_{self.signaling}")()
+            await asyncio.wait_for(validated, self.validate_timeout)
+        finally:
+            # Closing a connection that failed to signal must not fail it
+            validated.cancel()
+
+        for topic in {**self.carried, **self.subscriptions}:
+            conn.subscribe(topic)
+        for topic, subscribers in self.conflated.items():
+            for callback, rate in subscribers:
+                conn.conflate(topic, callback, rate)
+        self.conn = conn
+        self.last_message = loop.time()
+        self.connected.set()
+        if self.on_validated:
+            self.on_validated()
+        return lost
+
+    async def watch(self, lost):
+        if not self.silence_timeout:
+            await lost
+            return
+        loop = asyncio.get_running_loop()
+        while not lost.done():
+            remaining = self.last_message + self.silence_timeout - loop.time()
+            if remaining <= 0:
+                logger.warning("No message for %.1fs", self.silence_timeout)
+                return
+            await asyncio.wait([lost], timeout=remaining)
@@ -0,0 +1,183 @@
+# Copyright (c) 2024, RoboVerse community
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice, this
+#    list of conditions and the following disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+import asyncio
+import logging
+import time
+
+import numpy as np
+from aiortc.mediastreams import MediaStreamError
+
+from go2_webrtc.latency import RollingHistogram
+
+
+logger = logging.getLogger(__name__)
+
+
+# Single plane pixel formats and their bytes per pixel
+PACKED_FORMATS = {"bgr24": 3, "rgb24": 3, "bgra": 4, "rgba": 4, "gray": 1}
+
+
+def frame_to_ndarray(frame, format="bgr24"):
+    """Convert a VideoFrame to a (height, width[, channels]) uint8 array.
+
+    The array is a view of the converted frame's plane, the pixel format
+    conversion is the only copy. Formats outside PACKED_FORMATS go through
+    VideoFrame.to_ndarray.
+    """
+    channels = PACKED_FORMATS.get(format)
+    if channels is None:
+        return frame.to_ndarray(format=format)
+    if frame.format.name != format:
+        frame = frame.reformat(format=format)
+    plane = frame.planes[0]
+    # Rows may be padded, the view skips the padding instead of copying
+    rows = np.frombuffer(plane, np.uint8).reshape(plane.height, plane.line_size)
+    pixels = rows[:, : plane.width * channels]
+    if channels == 1:
+        return pixels
+    return pixels.reshape(plane.height, plane.width, channels)
+
+
+class VideoConsumer:
+    """Receive a video track and keep only its latest frame as an array.
+
+    Frames are pulled from the track as fast as aiortc decodes them, which
+    it does in its own thread, and converted to `format` in an executor
+    thread. Only the newest frame is converted: a frame still waiting when
+    the next one arrives is skipped and counted in `dropped`, so neither a
+    slow conversion nor a slow consumer builds up latency. `latency` holds
+    the time from receiving a frame to its array being ready.
+
+    Read the newest frame with `latest()`, or iterate `frames()`, which
+    skips whatever arrived while the consumer was busy.
+    """
+
+    def __init__(self, format="bgr24", executor=None, window=60.0):
+        self.format = format
+        self.executor = executor
+        self.latency = RollingHistogram(window)
+
+        self.frame = None
+        self.pts = None
+        self.time_base = None
+        # Bumped for every converted frame
+        self.seq = 0
+        self.received = 0
+        self.converted = 0
+        self.dropped = 0
+        self.ended = False
+
+        self.waiting = None
+        self.converter = None
+        self.updated = None
+        self.task = None
+
+    def start(self, track):
+        self.ended = False
+        self.updated = asyncio.Event()
+        self.task = asyncio.ensure_future(self.run(track))
+        return self.task
+
+    async def stop(self):
+        for task in (self.task, self.converter):
+            if task is not None:
+                task.cancel()
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
+        self.task = None
+        self.converter = None
+        self.finish()
+
+    async def run(self, track):
+        try:
+            while True:
+                try:
+                    frame = await track.recv()
+                except MediaStreamError:
+                    break
+                self.received += 1
+                if self.waiting is not None:
+                    self.dropped += 1
+                self.waiting = (frame, time.perf_counter())
+                if self.converter is None or self.converter.done():
+                    self.converter = asyncio.ensure_future(self.convert())
+            if self.converter is not None:
+                await self.converter
+        finally:
+            self.finish()
+
+    async def convert(self):
+        loop = asyncio.get_running_loop()
+        while self.waiting is not None:
+            frame, received = self.waiting
+            self.waiting = None
+            try:
+                array = await loop.run_in_executor(
+                    self.executor, frame_to_ndarray, frame, self.format
+                )
+            except Exception as e:
+                logger.error("Failed to convert video frame: %s", e)
+                continue
+            self.latency.record(time.perf_counter() - received)
+            self.frame = array
+            self.pts = frame.pts
+            self.time_base = frame.time_base
+            self.seq += 1
+            self.converted += 1
+            self.notify()
+
+    def notify(self):
+        updated, self.updated = self.updated, asyncio.Event()
+        updated.set()
+
+    def finish(self):
+        self.ended = True
+        if self.updated is not None:
+            self.updated.set()
+
+    def latest(self):
+        """Return the newest frame array, None before the first frame."""
+        return self.frame
+
+    async def frames(self):
+        """Yield frames as they are converted, skipping missed ones."""
+        seen = 0
+        while True:
+            if self.seq == seen:
+                if self.ended or self.updated is None:
+                    return
+                await self.updated.wait()
+                continue
+            seen = self.seq
+            yield self.frame
+
+    def stats(self):
+        return {
+            "received": self.received,
+            "converted": self.converted,
+            "dropped": self.dropped,
+            "latency": self.latency.window().summary(),
+        }
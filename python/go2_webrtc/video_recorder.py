@@ -0,0 +1,218 @@
+# Copyright (c) 2024, RoboVerse community
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice, this
+#    list of conditions and the following disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+# Passthrough recording of received video.
+#
+# Encoded frames are taken from the RTCRtpReceiver as aiortc reassembles
+# them, before they reach its decoder, and muxed into segment files as
+# they are, without decoding or re-encoding:
+#
+#   segment-00000.ts  H264 in MPEG-TS, which the robot sends
+#   segment-00000.mkv VP8 in Matroska, MPEG-TS cannot carry VP8
+#
+# Every segment starts with a keyframe, so each one plays on its own.
+
+import fractions
+import glob
+import logging
+import os
+import queue
+import threading
+
+import av
+
+
+logger = logging.getLogger(__name__)
+
+
+# codec -> container format, file suffix
+CONTAINERS = {"h264": ("mpegts", "ts"), "vp8": ("matroska", "mkv")}
+# RTP video clock rate, the unit of the encoded frame timestamps
+TIME_BASE = fractions.Fraction(1, 90000)
+
+
+def is_keyframe(codec_name, data):
+    if codec_name == "vp8":
+        # Frame tag bit 0 is clear on keyframes
+        return bool(data) and not data[0] & 1
+    # Annex B stream: look for an IDR slice among the NAL units
+    start = data.find(b"\x00\x00\x01")
+    while start != -1 and start + 3 < len(data):
+        if data[start + 3] & 0x1F == 5:
+            return True
+        start = data.find(b"\x00\x00\x01", start + 3)
+    return False
+
+
+def vp8_size(data):
+    # Keyframes carry the dimensions after the frame tag and start code
+    return (
+        int.from_bytes(data[6:8], "little") & 0x3FFF,
+        int.from_bytes(data[8:10], "little") & 0x3FFF,
+    )
+
+
+class VideoSegmentRecorder:
+    """Record a received video track into rotating segments, as received.
+
+    `attach` taps the encoded frames of an RTCRtpReceiver on their way to
+    the decoder, with `decode=False` they no longer reach it at all. The
+    frames are queued and muxed by a writer thread, which starts a new
+    segment at the first keyframe after `segment_duration` seconds or
+    `segment_size` bytes. Frames before the first keyframe are skipped.
+    When more than `max_pending` frames are waiting, new ones are dropped
+    and counted in `dropped`.
+    """
+
+    def __init__(
+        self, directory, segment_duration=60.0, segment_size=None, max_pending=1000
+    ):
+        self.directory = directory
+        self.segment_duration = segment_duration
+        self.segment_size = segment_size
+        self.queue = queue.Queue(maxsize=max_pending)
+        self.dropped = 0
+        self.recorded = 0
+        self.skipped = 0
+        # Set by attach, the next queued frame then starts a new segment
+        self.new_track = False
+
+        os.makedirs(directory, exist_ok=True)
+        # Appending to an existing recording starts a new segment
+        self.segment_number = len(glob.glob(os.path.join(directory, "segment-*")))
+        self.container = None
+        self.stream = None
+        self.codec_name = None
+        self.segment_start = None
+        self.segment_bytes = 0
+        self.last_dts = None
+        self.segments = []
+
+        self.thread = threading.Thread(target=self.run, name="go2-video-recorder", daemon=True)
+        self.thread.start()
+
+    def attach(self, receiver, decode=True):
+        """Record the encoded frames `receiver` hands to its decoder thread."""
+        # aiortc has no public hook, the queue is private to the receiver
+        decoder_queue = receiver._RTCRtpReceiver__decoder_queue
+        put = decoder_queue.put
+
+        def tee(task, *args, **kwargs):
+            if task is not None:
+                self.put(*task)
+                if not decode:
+                    return
+            put(task, *args, **kwargs)
+
+        decoder_queue.put = tee
+        # Timestamps of a new track restart, so does the segment
+        self.new_track = True
+
+    def put(self, codec, frame):
+        try:
+            self.queue.put_nowait(
+                (codec.name.lower(), frame.data, frame.timestamp, self.new_track)
+            )
+        except queue.Full:
+            self.dropped += 1
+            return
+        self.new_track = False
+
+    def close(self):
+        """Write everything queued so far and stop the writer thread."""
+        if self.thread.is_alive():
+            self.queue.put(None)
+            self.thread.join()
+
+    def run(self):
+        while True:
+            task = self.queue.get()
+            if task is None:
+                break
+            codec_name, data, timestamp, new_track = task
+            if new_track:
+                self.close_segment()
+            try:
+                self.write_frame(codec_name, data, timestamp)
+            except (OSError, av.FFmpegError, ValueError) as e:
+                logger.error("Failed to write video segment: %s", e)
+                self.close_segment()
+        self.close_segment()
+
+    def write_frame(self, codec_name, data, timestamp):
+        keyframe = is_keyframe(codec_name, data)
+        if self.container is None or codec_name != self.codec_name:
+            if not keyframe:
+                self.skipped += 1
+                return
+            self.open_segment(codec_name, data, timestamp)
+        elif keyframe and self.segment_full(timestamp):
+            self.open_segment(codec_name, data, timestamp)
+
+        # Muxers want strictly increasing timestamps
+        dts = timestamp - self.segment_start
+        if self.last_dts is not None and dts <= self.last_dts:
+            dts = self.last_dts + 1
+        self.last_dts = dts
+
+        packet = av.Packet(data)
+        packet.stream = self.stream
+        packet.pts = packet.dts = dts
+        packet.time_base = TIME_BASE
+        packet.is_keyframe = keyframe
+        self.container.mux(packet)
+        self.segment_bytes += len(data)
+        self.recorded += 1
+
+    def segment_full(self, timestamp):
+        if self.segment_duration and (
+            (timestamp - self.segment_start) * TIME_BASE >= self.segment_duration
+        ):
+            return True
+        return bool(self.segment_size) and self.segment_bytes >= self.segment_size
+
+    def open_segment(self, codec_name, data, timestamp):
+        self.close_segment()
+        if codec_name not in CONTAINERS:
+            raise ValueError(f"Cannot record {codec_name} video")
+        container_format, suffix = CONTAINERS[codec_name]
+        path = os.path.join(self.directory, f"segment-{self.segment_number:05d}.{suffix}")
+        self.segment_number += 1
+        self.container = av.open(path, "w", format=container_format)
+        self.stream = self.container.add_stream(codec_name)
+        if codec_name == "vp8":
+            self.stream.width, self.stream.height = vp8_size(data)
+        self.codec_name = codec_name
+        self.segment_start = timestamp
+        self.segment_bytes = 0
+        self.last_dts = None
+        self.segments.append(path)
+        logger.debug("Recording video to %s", path)
+
+    def close_segment(self):
+        if self.container is not None:
+            try:
+                self.container.close()
+            finally:
+                self.container = None
+                self.stream = None
@@ -0,0 +1,174 @@
+# Copyright (c) 2024, RoboVerse community
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice, this
+#    list of conditions and the following disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+import collections
+import time
+
+import numpy as np
+
+
+VOXEL_MAP_TOPIC = "rt/utlidar/voxel_map_compressed"
+ROBOT_POSE_TOPIC = "rt/utlidar/robot_pose"
+
+# Voxel indices are packed into one int64 key, 21 bits per axis
+KEY_BITS = 21
+KEY_BIAS = 1 << (KEY_BITS - 1)
+KEY_MASK = (1 << KEY_BITS) - 1
+
+
+def pack_keys(cells):
+    cells = cells.astype(np.int64) + KEY_BIAS
+    return (cells[:, 0] << (2 * KEY_BITS)) | (cells[:, 1] << KEY_BITS) | cells[:, 2]
+
+
+def unpack_keys(keys):
+    keys = np.asarray(keys, dtype=np.int64)
+    cells = np.stack(
+        [keys >> (2 * KEY_BITS), (keys >> KEY_BITS) & KEY_MASK, keys & KEY_MASK], axis=1
+    )
+    return cells - KEY_BIAS
+
+
+def pose_from_message(msgobj):
+    """Extract (position, quaternion xyzw) from a rt/utlidar/robot_pose message."""
+    pose = msgobj["data"]["pose"]
+    position = pose["position"]
+    orientation = pose["orientation"]
+    return (
+        np.array([position["x"], position["y"], position["z"]], dtype=np.float64),
+        np.array(
+            [orientation["x"], orientation["y"], orientation["z"], orientation["w"]],
+            dtype=np.float64,
+        ),
+    )
+
+
+def transform_points(points, pose):
+    position, (x, y, z, w) = pose
+    rotation = np.array(
+        [
+            [1 - 2 * (y * y + z * z), 2 * (x * y - z * w), 2 * (x * z + y * w)],
+            [2 * (x * y + z * w), 1 - 2 * (x * x + z * z), 2 * (y * z - x * w)],
+            [2 * (x * z - y * w), 2 * (y * z + x * w), 1 - 2 * (x * x + y * y)],
+        ]
+    )
+    return points @ rotation.T + position
+
+
+class VoxelMap:
+    """Sparse occupancy map fused from successive lidar frames.
+
+    Cells are kept in a hash map keyed by their packed voxel index. Each
+    frame is diffed against the previous one, so only cells that appeared
+    or disappeared are touched. Cells no longer observed are evicted
+    `ttl` seconds after they were last seen. Once more than `max_cells`
+    are stored, the cells that are no longer observed go first, oldest
+    first.
+
+    Voxel map frames are published in the odometry frame. Set
+    `sensor_frame=True` for point sources relative to the robot, they are
+    then moved into the map frame with the latest robot pose.
+    """
+
+    def __init__(self, resolution=0.05, ttl=30.0, max_cells=1_000_000, sensor_frame=False):
+        self.resolution = resolution
+        self.ttl = ttl
+        self.max_cells = max_cells
+        self.sensor_frame = sensor_frame
+        self.pose = None
+        # key -> time the cell was last seen, oldest first
+        self.cells = collections.OrderedDict()
+        self.live = np.empty(0, dtype=np.int64)
+        self.live_set = set()
+
+    def __len__(self):
+        return len(self.cells)
+
+    def set_pose(self, pose):
+        self.pose = pose
+
+    def update(self, msgobj):
+        """Feed a robot pose or a voxel map decoded with mode="points"."""
+        topic = msgobj.get("topic")
+        if topic == ROBOT_POSE_TOPIC:
+            self.set_pose(pose_from_message(msgobj))
+        elif topic == VOXEL_MAP_TOPIC:
+            data = msgobj["data"]
+            return self.integrate(data["data"]["points"], data.get("stamp"))
+        return None
+
+    def integrate(self, points, stamp=None):
+        """Merge one frame of points, returns the number of (added, removed) cells."""
+        stamp = time.monotonic() if stamp is None else stamp
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 3)
+        if self.sensor_frame and self.pose is not None:
+            points = transform_points(points, self.pose)
+
+        keys = np.unique(pack_keys(np.floor(points / self.resolution)))
+        added = np.setdiff1d(keys, self.live, assume_unique=True)
+        removed = np.setdiff1d(self.live, keys, assume_unique=True)
+        self.live = keys
+
+        cells = self.cells
+        for key in added.tolist():
+            cells[key] = stamp
+            cells.move_to_end(key)
+            self.live_set.add(key)
+        for key in removed.tolist():
+            self.live_set.discard(key)
+            # Start the decay clock, unless the cell was already evicted
+            if key in cells:
+                cells[key] = stamp
+                cells.move_to_end(key)
+
+        self.expire(stamp)
+        return len(added), len(removed)
+
+    def expire(self, now):
+        cells = self.cells
+        evicted_live = []
+        while cells:
+            key, seen = next(iter(cells.items()))
+            over_budget = len(cells) > self.max_cells
+            if not over_budget and now - seen <= self.ttl:
+                break
+            # Observed cells only go once no stale cell is left to evict
+            if key in self.live_set and (not over_budget or len(self.live_set) < len(cells)):
+                # Still observed, push it back behind the stale cells
+                cells[key] = now
+                cells.move_to_end(key)
+                continue
+            del cells[key]
+            if key in self.live_set:
+                self.live_set.discard(key)
+                evicted_live.append(key)
+        if evicted_live:
+            # Forget them as live too, so they are added back when seen again
+            self.live = np.setdiff1d(self.live, evicted_live, assume_unique=True)
+
+    def occupied(self):
+        """Return the centres of all stored cells as (N, 3) float32 metres."""
+        if not self.cells:
+            return np.empty((0, 3), dtype=np.float32)
+        keys = np.fromiter(self.cells.keys(), dtype=np.int64, count=len(self.cells))
+        return ((unpack_keys(keys) + 0.5) * self.resolution).astype(np.float32)
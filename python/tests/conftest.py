@@ -0,0 +1,16 @@
+import os
+
+import pytest
+
+
+@pytest.fixture(scope="session", autouse=True)
+def cache_dir(tmp_path_factory):
+    """Keep compiled modules and robot keys out of the user's cache."""
+    path = tmp_path_factory.mktemp("cache")
+    previous = os.environ.get("GO2_WEBRTC_CACHE_DIR")
+    os.environ["GO2_WEBRTC_CACHE_DIR"] = str(path)
+    yield path
+    if previous is None:
+        del os.environ["GO2_WEBRTC_CACHE_DIR"]
+    else:
+        os.environ["GO2_WEBRTC_CACHE_DIR"] = previous
@@ -0,0 +1,30 @@
+import pytest
+
+from go2_webrtc import codec
+
+
+@pytest.fixture(params=codec.available())
+def backend(request):
+    previous = codec.backend
+    codec.use(request.param)
+    yield request.param
+    codec.use(previous)
+
+
+def test_round_trip(backend):
+    message = {"type": "msg", "topic": "rt/sportmodestate", "data": {"position": [0.5, -1.25], "mode": 1}}
+    text = codec.dumps(message)
+    # Data channel text frames must be str, bytes would be sent as binary
+    assert isinstance(text, str)
+    assert codec.loads(text) == message
+    assert codec.loads(text.encode("utf-8")) == message
+
+
+def test_decode_error(backend):
+    with pytest.raises(codec.DecodeError):
+        codec.loads('{"topic": ')
+
+
+def test_unknown_backend():
+    with pytest.raises(ValueError):
+        codec.use("yaml")
@@ -0,0 +1,54 @@
+import asyncio
+import json
+
+import pytest
+
+from go2_webrtc import codec
+from go2_webrtc.go2_connection import Go2Connection
+
+
+def lowstate(tick):
+    return json.dumps({"type": "msg", "topic": "rt/lf/lowstate", "data": {"tick": tick}})
+
+
+@pytest.mark.asyncio
+async def test_latest_parses_only_on_demand(monkeypatch):
+    parsed = []
+    loads = codec.loads
+    monkeypatch.setattr(codec, "loads", lambda s: parsed.append(s) or loads(s))
+    dispatched = []
+    conn = Go2Connection(on_message=lambda message, msgobj: dispatched.append(msgobj))
+    conn.conflate("rt/lf/lowstate")
+    try:
+        assert conn.latest("rt/lf/lowstate") is None
+        for tick in range(100):
+            conn.on_data_channel_message(lowstate(tick))
+        assert parsed == []
+        assert conn.latest("rt/lf/lowstate")["data"]["tick"] == 99
+        assert conn.latest("rt/lf/lowstate")["data"]["tick"] == 99
+        assert len(parsed) == 1
+        assert dispatched == []
+    finally:
+        await conn.pc.close()
+
+
+@pytest.mark.asyncio
+async def test_fixed_rate_subscription_gets_latest_value():
+    received = []
+    conn = Go2Connection()
+    task = conn.conflate(
+        "rt/lf/lowstate", lambda message, msgobj: received.append(msgobj["data"]["tick"]), rate=50
+    )
+    try:
+        for tick in range(10):
+            conn.on_data_channel_message(lowstate(tick))
+        await asyncio.sleep(0.05)
+        # Nothing new arrived, nothing is delivered again
+        await asyncio.sleep(0.05)
+        conn.on_data_channel_message(lowstate(10))
+        await asyncio.sleep(0.05)
+    finally:
+        task.cancel()
+        await conn.pc.close()
+
+    assert received == [9, 10]
@@ -0,0 +1,131 @@
+import asyncio
+import json
+import os
+import signal
+import struct
+
+import numpy as np
+import pytest
+
+from go2_webrtc.fleet import FleetManager
+from go2_webrtc.go2_connection import Go2Connection
+from go2_webrtc.lidar_numpy import lz4_block_compress
+from test_supervisor import FakeRobot, wait_for
+
+
+def voxel_message(seq):
+    grid = np.zeros((20, 128, 128), dtype=bool)
+    grid[3, 5, 9:11] = True
+    payload = lz4_block_compress(np.packbits(grid).tobytes())
+    header = json.dumps(
+        {
+            "type": "msg",
+            "topic": "rt/utlidar/voxel_map_compressed",
+            "data": {"origin": [0.0, 0.0, 0.5], "resolution": 0.05, "seq": seq},
+        }
+    ).encode("utf-8")
+    return struct.pack("<HH", len(header), 0) + header + payload
+
+
+@pytest.mark.asyncio
+async def test_flooding_robot_does_not_starve_others():
+    fleet = FleetManager(decode_workers=1, executor="thread", max_pending=2)
+    flooding = fleet.add("flooding", "192.168.12.10")
+    quiet = fleet.add("quiet", "192.168.12.11")
+    delivered = {"flooding": [], "quiet": []}
+
+    def on_decoded(name):
+        return lambda message, msgobj: delivered[name].append(msgobj["data"]["seq"])
+
+    try:
+        for seq in range(50):
+            flooding.decode_pool.put_nowait(voxel_message(seq), on_decoded("flooding"))
+            if seq % 25 == 0:
+                quiet.decode_pool.put_nowait(voxel_message(seq), on_decoded("quiet"))
+        await asyncio.wait_for(
+            asyncio.gather(flooding.decode_pool.join(), quiet.decode_pool.join()), 30
+        )
+    finally:
+        await fleet.stop()
+
+    assert delivered["quiet"] == [0, 25]
+    assert delivered["flooding"][-1] == 49
+    health = await fleet.health()
+    assert health["robots"]["quiet"]["decode_dropped"] == 0
+    assert health["decode_dropped"] == flooding.decode_pool.dropped > 0
+
+
+async def decode_all(fleet, seq):
+    """Decode one message per robot, returns the robots that got a result."""
+    delivered = set()
+    for name, robot in fleet.robots.items():
+        try:
+            robot.decode_pool.put_nowait(voxel_message(seq), lambda *_, name=name: delivered.add(name))
+        except RuntimeError:
+            continue
+    await asyncio.wait_for(
+        asyncio.gather(*(robot.decode_pool.join() for robot in fleet.robots.values())), 60
+    )
+    return delivered
+
+
+@pytest.mark.asyncio
+async def test_decoding_recovers_after_a_worker_dies():
+    fleet = FleetManager(decode_workers=1, executor="process")
+    fleet.add("alpha", "192.168.12.10")
+    fleet.add("beta", "192.168.12.11")
+    try:
+        assert await decode_all(fleet, 0) == {"alpha", "beta"}
+        broken = fleet.executor
+        for pid in list(broken._processes):
+            os.kill(pid, signal.SIGKILL)
+
+        # Messages in flight when the worker died are lost, later ones decode
+        for seq in range(1, 10):
+            if await decode_all(fleet, seq) == {"alpha", "beta"} and fleet.executor is not broken:
+                break
+            await asyncio.sleep(0.1)
+        assert fleet.executor is not broken
+        assert all(robot.decode_pool.executor is fleet.executor for robot in fleet.robots.values())
+        assert await decode_all(fleet, 10) == {"alpha", "beta"}
+    finally:
+        await fleet.stop()
+
+
+@pytest.mark.asyncio
+async def test_fleet_connects_and_reports_health(monkeypatch):
+    robots = {}
+
+    async def answer(conn):
+        robot = robots.setdefault(conn.ip, FakeRobot())
+        await robot.answer(conn)
+
+    monkeypatch.setattr(Go2Connection, "connect_robot_v10", answer)
+    fleet = FleetManager(executor="thread", probe_interval=0.05, backoff=0.01)
+    fleet.add("alpha", "192.168.12.10")
+    fleet.add("beta", "192.168.12.11")
+    fleet.start()
+    try:
+        await wait_for(lambda: all(robot.conn for robot in fleet.robots.values()))
+        assert sorted(fleet.broadcast({"type": "msg", "topic": "rt/test"})) == ["alpha", "beta"]
+
+        def got_test_message(ip):
+            return any(m.get("topic") == "rt/test" for m in robots[ip].received[-1])
+
+        await wait_for(lambda: got_test_message("192.168.12.10") and got_test_message("192.168.12.11"))
+
+        first = fleet.robots["alpha"].conn
+        await robots["192.168.12.10"].peers[0].close()
+        await wait_for(lambda: fleet.robots["alpha"].conn not in (None, first))
+
+        health = await fleet.health()
+        assert health["connected"] == health["total"] == 2
+        assert health["robots"]["alpha"]["reconnects"] == 1
+        assert health["robots"]["beta"]["reconnects"] == 0
+        # The probe followed the new connection
+        assert fleet.robots["alpha"].probe.conn is fleet.robots["alpha"].conn
+        assert health["robots"]["alpha"]["latency"]["heartbeats_sent"] > 0
+    finally:
+        await fleet.stop()
+        for robot in robots.values():
+            await robot.close()
@@ -1,5 +1,7 @@
 import pytest
 import asyncio
+import subprocess
+import sys
 from go2_webrtc import (
     Go2Connection,
 )  # Adjust the import according to your project structure
@@ -23,3 +25,14 @@ async def test_set_answer():
     await conn.set_answer(answer)
     # Since set_answer doesn't return a value, we're just checking if it runs without raising an exception
     assert True, "set_answer should complete without error"
+
+
+def test_constants_import_is_lightweight():
+    probe = (
+        "import sys; from go2_webrtc import ROBOT_CMD, SPORT_CMD; "
+        "print(sorted(m for m in ('aiortc', 'wasmtime', 'dotenv') if m in sys.modules))"
+    )
+    output = subprocess.run(
+        [sys.executable, "-c", probe], capture_output=True, check=True, text=True
+    ).stdout
+    assert output.strip() == "[]"
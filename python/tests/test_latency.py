@@ -0,0 +1,62 @@
+import asyncio
+import json
+
+import pytest
+
+from go2_webrtc.go2_connection import Go2Connection
+from go2_webrtc.latency import LatencyHistogram, LatencyProbe, RollingHistogram
+
+
+def test_histogram_percentiles_are_accurate():
+    histogram = LatencyHistogram()
+    for ms in range(1, 1001):
+        histogram.record(ms / 1000)
+    assert histogram.count == 1000
+    for q in (50, 90, 99):
+        assert histogram.percentile(q) == pytest.approx(q / 100, rel=1 / 32)
+    assert histogram.summary()["max_ms"] == pytest.approx(1000)
+    assert LatencyHistogram().percentile(50) == 0.0
+
+
+def test_histogram_buckets_are_contiguous():
+    histogram = LatencyHistogram(sub_buckets=8)
+    previous = -1
+    for value in range(5000):
+        index = histogram.index(value)
+        assert index in (previous, previous + 1)
+        assert histogram.lowest(index) <= value < histogram.lowest(index + 1)
+        previous = index
+
+
+def test_rolling_window_forgets_old_samples():
+    now = [0.0]
+    rolling = RollingHistogram(window=10.0, slots=5, clock=lambda: now[0])
+    rolling.record(0.5)
+    now[0] = 20.0
+    rolling.record(0.01)
+    assert rolling.window().count == 1
+    assert rolling.lifetime.count == 2
+
+
+@pytest.mark.asyncio
+async def test_probe_measures_heartbeat_echo():
+    conn = Go2Connection()
+    conn.data_channel._setReadyState("open")
+    sent = []
+    conn.data_channel.send = sent.append
+    probe = LatencyProbe(conn, interval=0.01)
+    probe.start()
+    try:
+        await asyncio.sleep(0.035)
+        # The robot echoes heartbeats back unchanged
+        for message in sent:
+            conn.on_data_channel_message(message)
+        stats = await probe.stats()
+    finally:
+        probe.stop()
+        await conn.pc.close()
+
+    assert json.loads(sent[0])["type"] == "heartbeat"
+    assert stats["heartbeat_rtt"]["count"] == len(sent) >= 3
+    assert stats["heartbeats_lost"] == 0
+    assert "sctp" in stats["transport"]
@@ -0,0 +1,270 @@
+import asyncio
+import json
+import struct
+
+import numpy as np
+import pytest
+
+from go2_webrtc.lidar_decoder import LidarDecoder
+from go2_webrtc.go2_connection import Go2Connection
+from go2_webrtc.lidar_numpy import (
+    lz4_block_compress,
+    lz4_block_decompress,
+    occupied_cells,
+    unpack_voxels,
+)
+from go2_webrtc.lidar_pool import LidarDecodePool
+
+
+HEADER = {"origin": [0.0, 0.0, 0.5], "resolution": 0.05}
+
+
+def lz4_literals(raw):
+    # Smallest valid LZ4 block: a single literal-only sequence
+    n = len(raw)
+    block = bytearray()
+    if n < 15:
+        block.append(n << 4)
+    else:
+        block.append(0xF0)
+        n -= 15
+        while n >= 255:
+            block.append(255)
+            n -= 255
+        block.append(n)
+    block += raw
+    return bytes(block)
+
+
+def voxel_payload():
+    grid = np.zeros((20, 128, 128), dtype=bool)
+    grid[3, 5, 9:11] = True
+    grid[10, 64, 100] = True
+    return lz4_literals(np.packbits(grid).tobytes())
+
+
+@pytest.fixture(scope="module")
+def decoder():
+    return LidarDecoder()
+
+
+def test_decode_copies_by_default(decoder):
+    result = decoder.decode(voxel_payload(), HEADER)
+    assert result["point_count"] == 3
+    assert result["face_count"] == 16
+    assert result["positions"].shape == (16 * 12,)
+    assert result["uvs"].shape == (16 * 8,)
+    assert result["indices"].dtype == np.uint32
+    assert result["indices"][:6].tolist() == [0, 1, 2, 2, 1, 3]
+    assert result["positions"].flags.owndata
+
+
+def test_decode_zero_copy_aliases_wasm_memory(decoder):
+    copied = decoder.decode(voxel_payload(), HEADER)
+    viewed = decoder.decode(voxel_payload(), HEADER, zero_copy=True)
+    for key in ("positions", "uvs", "indices"):
+        assert np.array_equal(copied[key], viewed[key])
+        assert not viewed[key].flags.owndata
+
+
+def test_decode_into_preallocated_buffers(decoder):
+    out = {
+        "positions": np.zeros(1024, dtype=np.uint8),
+        "uvs": np.zeros(1024, dtype=np.uint8),
+        "indices": np.zeros(1024, dtype=np.uint32),
+    }
+    copied = decoder.decode(voxel_payload(), HEADER)
+    result = decoder.decode(voxel_payload(), HEADER, out=out)
+    for key in ("positions", "uvs", "indices"):
+        assert np.array_equal(copied[key], result[key])
+        assert np.shares_memory(result[key], out[key])
+
+
+def test_decode_rejects_small_out_buffers(decoder):
+    out = {
+        "positions": np.zeros(8, dtype=np.uint8),
+        "uvs": np.zeros(1024, dtype=np.uint8),
+        "indices": np.zeros(1024, dtype=np.uint32),
+    }
+    with pytest.raises(ValueError):
+        decoder.decode(voxel_payload(), HEADER, out=out)
+
+
+def test_move_bytes_handles_overlap(decoder):
+    start = decoder.input
+    decoder.write_bytes(start, bytes(range(16)))
+    decoder.copy_within(start + 4, start, start + 8)
+    assert decoder.heap_view(start, 16).tolist() == (
+        [0, 1, 2, 3, 0, 1, 2, 3, 4, 5, 6, 7, 12, 13, 14, 15]
+    )
+
+
+def test_memory_transfers_are_bounds_checked(decoder):
+    with pytest.raises(ValueError):
+        decoder.write_bytes(decoder.memory_size - 2, b"abcd")
+    with pytest.raises(ValueError):
+        decoder.move_bytes(decoder.memory_size - 2, 0, 4)
+    with pytest.raises(ValueError):
+        decoder.decode(bytes(decoder.inputSize + 1), HEADER)
+
+
+def binary_message(payload, header):
+    header = json.dumps(
+        {"type": "msg", "topic": "rt/utlidar/voxel_map_compressed", "data": header}
+    ).encode("utf-8")
+    return struct.pack("<HH", len(header), 0) + header + payload
+
+
+@pytest.mark.asyncio
+async def test_decode_pool_delivers_in_order():
+    pool = LidarDecodePool(workers=2, max_pending=4)
+    received = []
+    done = asyncio.Event()
+
+    def on_decoded(message, msgobj):
+        received.append(msgobj["data"]["seq"])
+        if len(received) == 6:
+            done.set()
+
+    try:
+        for seq in range(6):
+            header = dict(HEADER, seq=seq)
+            await pool.put(binary_message(voxel_payload(), header), on_decoded)
+        await asyncio.wait_for(done.wait(), 30)
+    finally:
+        pool.shutdown()
+
+    assert received == list(range(6))
+
+
+@pytest.mark.asyncio
+async def test_decode_pool_is_bounded():
+    pool = LidarDecodePool(workers=1, max_pending=1)
+    try:
+        pool.put_nowait(binary_message(voxel_payload(), HEADER), lambda *_: None)
+        with pytest.raises(asyncio.QueueFull):
+            pool.put_nowait(binary_message(voxel_payload(), HEADER), lambda *_: None)
+    finally:
+        pool.shutdown()
+    assert pool.dropped == 1
+
+
+@pytest.mark.asyncio
+async def test_decode_pool_drops_oldest_frames():
+    pool = LidarDecodePool(workers=1, max_pending=2, executor="thread", policy="drop-oldest")
+    received = []
+    try:
+        for seq in range(5):
+            message = binary_message(voxel_payload(), dict(HEADER, seq=seq))
+            pool.put_nowait(message, lambda message, msgobj: received.append(msgobj))
+        await asyncio.wait_for(pool.join(), 30)
+    finally:
+        pool.shutdown()
+
+    # The first frame was already decoding, the rest were superseded by the last
+    assert [msgobj["data"]["seq"] for msgobj in received] == [0, 4]
+    assert received[1]["data"]["data"]["point_count"] == 3
+    assert pool.dropped == 3
+
+
+@pytest.mark.asyncio
+async def test_connection_decodes_through_pool(caplog):
+    received = []
+    done = asyncio.Event()
+
+    def on_message(message, msgobj):
+        received.append(msgobj)
+        done.set()
+
+    pool = LidarDecodePool(workers=1, max_pending=1)
+    conn = Go2Connection(on_message=on_message, decode_pool=pool)
+    try:
+        conn.on_data_channel_message(binary_message(voxel_payload(), HEADER))
+        # The pool only holds one message, the second one is dropped
+        conn.on_data_channel_message(binary_message(voxel_payload(), HEADER))
+        await asyncio.wait_for(done.wait(), 30)
+    finally:
+        pool.shutdown()
+        await conn.pc.close()
+
+    assert len(received) == 1
+    assert received[0]["topic"] == "rt/utlidar/voxel_map_compressed"
+    assert received[0]["data"]["data"]["point_count"] == 3
+    assert "Decode pool is full" in caplog.text
+
+
+def test_occupied_cells_match_the_unpacked_grid():
+    grid = structured_grid(3)
+    z, y, x = np.nonzero(unpack_voxels(np.packbits(grid).tobytes()))
+    cells = occupied_cells(np.packbits(grid).tobytes())
+    for expected, actual in zip((x, y, z), cells):
+        np.testing.assert_array_equal(actual, expected)
+
+
+def structured_grid(seed, layers=30):
+    # Blocky clusters compress like real maps and exercise all face cases
+    rng = np.random.default_rng(seed)
+    grid = np.zeros((layers, 128, 128), dtype=bool)
+    for _ in range(40):
+        x, y = rng.integers(0, 124, size=2)
+        z = rng.integers(0, layers - 2)
+        dx, dy, dz = rng.integers(1, 5, size=3)
+        grid[z:z + dz, y:y + dy, x:x + dx] = True
+    grid[0, 0, :] = True
+    grid[:, 127, 127] = True
+    grid |= rng.random(grid.shape) < 0.0005
+    return grid
+
+
+@pytest.mark.parametrize("seed", [0, 1, 2])
+@pytest.mark.parametrize("origin_z", [-2.0, 0.35, 1.6])
+def test_numpy_backend_matches_wasm(decoder, seed, origin_z):
+    payload = lz4_block_compress(np.packbits(structured_grid(seed)).tobytes())
+    header = {"origin": [1.0, -3.0, origin_z], "resolution": 0.05}
+
+    expected = decoder.decode(payload, header)
+    actual = LidarDecoder(backend="numpy").decode(payload, header)
+
+    assert actual["point_count"] == expected["point_count"]
+    assert actual["face_count"] == expected["face_count"]
+    for key in ("positions", "uvs", "indices"):
+        assert actual[key].dtype == expected[key].dtype
+        assert np.array_equal(actual[key], expected[key]), key
+
+
+def test_lz4_round_trip():
+    raw = np.packbits(structured_grid(3)).tobytes()
+    assert bytes(lz4_block_decompress(lz4_block_compress(raw))) == raw
+    with pytest.raises(ValueError):
+        lz4_block_decompress(b"\x1f\x00\x05\x00")
+
+
+def test_compiled_module_is_cached(tmp_path):
+    LidarDecoder(cache_dir=str(tmp_path))
+    cached = list(tmp_path.glob("libvoxel.wasm-*.bin"))
+    assert len(cached) == 1
+
+    # A second decoder deserializes the module, a corrupt file is replaced
+    assert LidarDecoder(cache_dir=str(tmp_path)).decode(voxel_payload(), HEADER)["point_count"] == 3
+    cached[0].write_bytes(b"garbage")
+    assert LidarDecoder(cache_dir=str(tmp_path)).decode(voxel_payload(), HEADER)["point_count"] == 3
+    assert cached[0].read_bytes() != b"garbage"
+
+
+@pytest.mark.parametrize("backend", ["wasm", "numpy"])
+def test_decode_points_in_world_coordinates(decoder, backend):
+    if backend == "numpy":
+        decoder = LidarDecoder(backend="numpy")
+    header = {"origin": [1.0, -2.0, 0.5], "resolution": 0.1}
+
+    result = decoder.decode(voxel_payload(), header, mode="points")
+
+    assert result["point_count"] == 3
+    assert result["points"].dtype == np.float32
+    assert "indices" not in result
+    np.testing.assert_allclose(
+        result["points"],
+        [[1.95, -1.45, 0.85], [2.05, -1.45, 0.85], [11.05, 4.45, 1.55]],
+        rtol=0,
+        atol=1e-5,
+    )
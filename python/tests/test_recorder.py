@@ -0,0 +1,60 @@
+import json
+import struct
+
+import pytest
+
+from go2_webrtc.go2_connection import Go2Connection
+from go2_webrtc.recorder import StreamReader, StreamRecorder
+
+
+def text_message(topic, value):
+    return json.dumps({"type": "msg", "topic": topic, "data": {"value": value}})
+
+
+def binary_message(topic, payload):
+    header = json.dumps({"type": "msg", "topic": topic}).encode("utf-8")
+    return struct.pack("H", len(header)) + b"\x00\x00" + header + payload
+
+
+def test_recording_round_trip(tmp_path):
+    recorder = StreamRecorder(str(tmp_path), segment_size=256)
+    for i in range(20):
+        recorder.record(text_message("rt/lf/lowstate", i), stamp=float(i))
+        recorder.record(binary_message("rt/utlidar/voxel_map_compressed", bytes([i]) * 50), stamp=i + 0.5)
+    recorder.close()
+
+    reader = StreamReader(str(tmp_path))
+    assert len(reader.segments) > 1
+    assert reader.stats() == {"rt/lf/lowstate": 20, "rt/utlidar/voxel_map_compressed": 20}
+
+    messages = list(reader.messages())
+    assert len(messages) == 40
+    assert messages[0] == (0.0, "rt/lf/lowstate", text_message("rt/lf/lowstate", 0))
+    assert messages[1][2] == binary_message("rt/utlidar/voxel_map_compressed", b"\x00" * 50)
+
+    lidar = list(reader.messages(topics=["rt/utlidar/voxel_map_compressed"], start=5, end=8))
+    assert [stamp for stamp, _, _ in lidar] == [5.5, 6.5, 7.5]
+    assert all(isinstance(message, bytes) for _, _, message in lidar)
+
+
+def test_recording_appends_to_existing_directory(tmp_path):
+    for value in range(2):
+        recorder = StreamRecorder(str(tmp_path))
+        recorder.record(text_message("rt/lf/lowstate", value), stamp=float(value))
+        recorder.close()
+    reader = StreamReader(str(tmp_path))
+    assert reader.topics == ["rt/lf/lowstate"]
+    assert [json.loads(m)["data"]["value"] for _, _, m in reader.messages()] == [0, 1]
+
+
+@pytest.mark.asyncio
+async def test_connection_records_raw_messages(tmp_path):
+    recorder = StreamRecorder(str(tmp_path))
+    conn = Go2Connection(recorder=recorder)
+    conn.on_data_channel_message(text_message("rt/lf/lowstate", 1))
+    await conn.pc.close()
+    recorder.close()
+
+    (_, topic, message), = StreamReader(str(tmp_path)).messages()
+    assert topic == "rt/lf/lowstate"
+    assert message == text_message("rt/lf/lowstate", 1)
@@ -0,0 +1,52 @@
+import json
+import time
+
+import pytest
+
+from go2_webrtc.recorder import StreamRecorder
+from go2_webrtc.replay import StreamReplay
+
+
+@pytest.fixture
+def recording(tmp_path):
+    recorder = StreamRecorder(str(tmp_path))
+    for i in range(5):
+        message = json.dumps({"type": "msg", "topic": "rt/lf/lowstate", "data": {"tick": i}})
+        recorder.record(message, stamp=100.0 + i * 0.05)
+    recorder.close()
+    return str(tmp_path)
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("speed, minimum", [(1.0, 0.2), (4.0, 0.05), (None, 0.0)])
+async def test_replay_timing(recording, speed, minimum):
+    received = []
+    replay = StreamReplay(
+        recording, on_message=lambda message, msgobj: received.append(msgobj), speed=speed
+    )
+    began = time.perf_counter()
+    assert await replay.run() == 5
+    elapsed = time.perf_counter() - began
+
+    assert [msgobj["data"]["tick"] for msgobj in received] == list(range(5))
+    assert elapsed >= minimum * 0.9
+    if speed is None:
+        assert elapsed < 0.1
+
+
+@pytest.mark.asyncio
+async def test_replay_time_window(recording):
+    received = []
+    replay = StreamReplay(
+        recording,
+        on_message=lambda message, msgobj: received.append(msgobj),
+        speed=None,
+        start=100.1,
+    )
+    await replay.run()
+    assert [msgobj["data"]["tick"] for msgobj in received] == [2, 3, 4]
+
+
+def test_replay_rejects_bad_speed(recording):
+    with pytest.raises(ValueError):
+        StreamReplay(recording, speed=0)
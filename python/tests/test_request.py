@@ -0,0 +1,66 @@
+import asyncio
+import json
+
+import pytest
+
+from go2_webrtc.constants import ROBOT_CMD, RTC_TOPIC
+from go2_webrtc.go2_connection import Go2Connection
+from go2_webrtc.router import TopicRouter
+
+
+def response(request, data):
+    identity = request["data"]["header"]["identity"]
+    return json.dumps(
+        {
+            "type": "res",
+            "topic": "rt/api/sport/response",
+            "data": {"header": {"identity": identity, "status": {"code": 0}}, "data": data},
+        }
+    )
+
+
+def open_connection():
+    # A router without routes checks that responses still get through
+    conn = Go2Connection(router=TopicRouter())
+    conn.data_channel._setReadyState("open")
+    conn.sent = []
+    conn.data_channel.send = lambda message: conn.sent.append(json.loads(message))
+    return conn
+
+
+@pytest.mark.asyncio
+async def test_requests_are_pipelined():
+    conn = open_connection()
+    api_ids = [ROBOT_CMD["GetBodyHeight"], ROBOT_CMD["GetSpeedLevel"], ROBOT_CMD["GetState"]]
+    tasks = [
+        asyncio.ensure_future(conn.request(RTC_TOPIC["SPORT_MOD"], api_id)) for api_id in api_ids
+    ]
+    await asyncio.sleep(0)
+    assert len(conn.sent) == 3
+    ids = [m["data"]["header"]["identity"]["id"] for m in conn.sent]
+    assert len(set(ids)) == 3
+
+    # Answer out of order
+    for request in reversed(conn.sent):
+        conn.on_data_channel_message(
+            response(request, str(request["data"]["header"]["identity"]["api_id"]))
+        )
+    results = await asyncio.gather(*tasks)
+    assert [result["data"] for result in results] == [str(api_id) for api_id in api_ids]
+    assert conn.pending == {}
+    await conn.pc.close()
+
+
+@pytest.mark.asyncio
+async def test_request_times_out():
+    conn = open_connection()
+    with pytest.raises(asyncio.TimeoutError):
+        await conn.request(RTC_TOPIC["SPORT_MOD"], ROBOT_CMD["GetState"], {"x": 1}, timeout=0.01)
+    assert json.loads(conn.sent[0]["data"]["parameter"]) == {"x": 1}
+    assert conn.pending == {}
+    await conn.pc.close()
+
+
+def test_generate_id_is_unique():
+    ids = [Go2Connection.generate_id() for _ in range(10000)]
+    assert len(set(ids)) == len(ids)
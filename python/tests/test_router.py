@@ -0,0 +1,56 @@
+import json
+
+import pytest
+
+from go2_webrtc import codec
+from go2_webrtc.go2_connection import Go2Connection
+from go2_webrtc.router import TopicRouter
+
+
+def text_message(topic, **data):
+    return json.dumps({"type": "msg", "topic": topic, "data": data})
+
+
+def test_exact_and_prefix_routes():
+    router = TopicRouter()
+    seen = []
+    router.add("rt/sportmodestate", lambda message, msgobj: seen.append(("exact", msgobj["topic"])))
+
+    @router.route("rt/utlidar/", prefix=True)
+    def on_lidar(message, msgobj):
+        seen.append(("prefix", msgobj["topic"]))
+
+    for topic in ["rt/sportmodestate", "rt/utlidar/robot_pose", "rt/lf/lowstate"]:
+        router.dispatch("", {"topic": topic})
+    assert seen == [("exact", "rt/sportmodestate"), ("prefix", "rt/utlidar/robot_pose")]
+
+    assert router.wants("rt/utlidar/voxel_map_compressed")
+    assert not router.wants("rt/lf/lowstate")
+    assert router.wants("")
+
+    router.remove("rt/utlidar/", on_lidar, prefix=True)
+    assert not router.wants("rt/utlidar/robot_pose")
+
+
+@pytest.mark.asyncio
+async def test_connection_only_parses_routed_topics(monkeypatch):
+    parsed = []
+    loads = codec.loads
+    monkeypatch.setattr(codec, "loads", lambda s: parsed.append(s) or loads(s))
+
+    router = TopicRouter()
+    states = []
+    router.add("rt/sportmodestate", lambda message, msgobj: states.append(msgobj["data"]))
+    validated = []
+    conn = Go2Connection(router=router, on_validated=lambda: validated.append(True))
+    try:
+        conn.on_data_channel_message(text_message("rt/lf/lowstate", tick=1))
+        conn.on_data_channel_message(text_message("rt/sportmodestate", mode=1))
+        # Validation has no topic and must get through regardless
+        conn.on_data_channel_message(json.dumps({"type": "validation", "data": "Validation Ok."}))
+    finally:
+        await conn.pc.close()
+
+    assert states == [{"mode": 1}]
+    assert validated == [True]
+    assert len(parsed) == 2
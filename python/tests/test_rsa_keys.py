@@ -0,0 +1,70 @@
+import base64
+
+from Crypto.PublicKey import RSA
+
+from go2_webrtc import rsa_keys
+from go2_webrtc.rsa_keys import PublicKeyResolver
+
+
+KEY = RSA.generate(1024, e=65537).publickey()
+PEM_DATA = base64.b64encode(KEY.export_key("DER")).decode("ascii")
+
+
+def count_trials(monkeypatch):
+    trials = []
+    parse_with = rsa_keys.parse_with
+
+    def counting(strategy, pem_data, key_bytes):
+        trials.append(strategy)
+        return parse_with(strategy, pem_data, key_bytes)
+
+    monkeypatch.setattr(rsa_keys, "parse_with", counting)
+    return trials
+
+
+def test_parsed_key_is_cached_in_memory(monkeypatch, tmp_path):
+    trials = count_trials(monkeypatch)
+    resolver = PublicKeyResolver(tmp_path)
+
+    key = resolver.load(PEM_DATA, "192.168.12.1")
+    assert key == KEY
+    assert trials == ["standard:0"]
+
+    assert resolver.load(PEM_DATA, "192.168.12.1") is key
+    assert len(trials) == 1
+
+
+def test_disk_cache_survives_a_new_resolver(monkeypatch, tmp_path):
+    PublicKeyResolver(tmp_path).load(PEM_DATA, "192.168.12.1")
+
+    trials = count_trials(monkeypatch)
+    key = PublicKeyResolver(tmp_path).load(PEM_DATA, "192.168.12.1")
+    assert key == KEY
+    assert trials == []
+
+
+def test_remembered_strategy_is_tried_first(monkeypatch, tmp_path):
+    # A 426-byte key goes through the firmware specific strategies first
+    key_bytes = KEY.n.to_bytes(384, "big") + b"\x00\x01\x00\x01" + bytes(38)
+    pem_data = base64.b64encode(key_bytes).decode("ascii")
+
+    trials = count_trials(monkeypatch)
+    first = PublicKeyResolver(False).load(pem_data, "robot")
+    assert first.n == KEY.n and first.e == 65537
+    assert trials[-1] == "pkcs1"
+    assert len(trials) > 1
+
+    resolver = PublicKeyResolver(tmp_path)
+    resolver.strategies["robot/426"] = "pkcs1"
+    trials.clear()
+    assert resolver.load(pem_data, "robot") == first
+    assert trials == ["pkcs1"]
+
+
+def test_generated_fallback_is_not_cached(monkeypatch, tmp_path):
+    resolver = PublicKeyResolver(tmp_path)
+    pem_data = base64.b64encode(b"not a key").decode("ascii")
+
+    first = resolver.load(pem_data)
+    assert resolver.load(pem_data) != first
+    assert resolver.strategies == {}
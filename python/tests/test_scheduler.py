@@ -0,0 +1,76 @@
+from go2_webrtc import codec
+from go2_webrtc.constants import ROBOT_CMD, RTC_TOPIC
+from go2_webrtc.scheduler import SendScheduler
+
+
+class FakeChannel:
+    readyState = "open"
+
+    def __init__(self):
+        self.bufferedAmount = 0
+        self.bufferedAmountLowThreshold = 0
+        self.sent = []
+        self.handlers = {}
+
+    def on(self, event, handler):
+        self.handlers[event] = handler
+
+    def send(self, message):
+        self.sent.append(codec.loads(message))
+        self.bufferedAmount += len(message)
+
+    def drain(self):
+        self.bufferedAmount = 0
+        self.handlers["bufferedamountlow"]()
+
+
+def sport(api_id, **parameter):
+    return {
+        "type": "msg",
+        "topic": RTC_TOPIC["SPORT_MOD"],
+        "data": {
+            "header": {"identity": {"id": 0, "api_id": api_id}},
+            "parameter": codec.dumps(parameter),
+        },
+    }
+
+
+def api_ids(messages):
+    return [m["data"]["header"]["identity"]["api_id"] for m in messages]
+
+
+def test_sends_directly_below_high_watermark():
+    channel = FakeChannel()
+    scheduler = SendScheduler(channel, low=10, high=1000)
+    scheduler.send(sport(ROBOT_CMD["StandUp"]))
+    assert api_ids(channel.sent) == [ROBOT_CMD["StandUp"]]
+    assert len(scheduler) == 0
+
+
+def test_moves_are_coalesced_while_congested():
+    channel = FakeChannel()
+    scheduler = SendScheduler(channel, low=10, high=1000)
+    channel.bufferedAmount = 5000
+    scheduler.send(sport(ROBOT_CMD["StandUp"]))
+    for x in range(5):
+        scheduler.send(sport(ROBOT_CMD["Move"], x=x, y=0, z=0))
+    assert channel.sent == []
+    assert len(scheduler) == 2
+
+    channel.drain()
+    assert api_ids(channel.sent) == [ROBOT_CMD["StandUp"], ROBOT_CMD["Move"]]
+    assert codec.loads(channel.sent[1]["data"]["parameter"])["x"] == 4
+    assert scheduler.superseded == 4
+
+
+def test_stop_jumps_the_queue_and_drops_moves():
+    channel = FakeChannel()
+    scheduler = SendScheduler(channel, low=10, high=1000)
+    channel.bufferedAmount = 5000
+    scheduler.send(sport(ROBOT_CMD["Move"], x=1, y=0, z=0))
+    scheduler.send(sport(ROBOT_CMD["Hello"]))
+    scheduler.send(sport(ROBOT_CMD["StopMove"]))
+    assert api_ids(channel.sent) == [ROBOT_CMD["StopMove"]]
+
+    channel.drain()
+    assert api_ids(channel.sent) == [ROBOT_CMD["StopMove"], ROBOT_CMD["Hello"]]
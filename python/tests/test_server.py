@@ -0,0 +1,85 @@
+import asyncio
+import importlib.util
+import os
+import time
+
+import pytest
+from aiohttp.test_utils import TestClient, TestServer
+
+from go2_webrtc.go2_connection import Go2Connection
+
+
+SERVER_PATH = os.path.join(os.path.dirname(__file__), "..", "..", "javascript", "server.py")
+
+
+def load_server():
+    spec = importlib.util.spec_from_file_location("go2_signaling_server", SERVER_PATH)
+    server = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(server)
+    return server
+
+
+server = load_server()
+
+
+def offer_body(ip):
+    return {"ip": ip, "token": "", "sdp": "v=0 offer", "type": "offer"}
+
+
+def serve(interval=0.0):
+    app = server.make_app()
+    app[server.LIMITER] = server.RobotLimiter(interval)
+    return TestClient(TestServer(app))
+
+
+@pytest.mark.asyncio
+async def test_malformed_offers_are_rejected():
+    async with serve() as client:
+        for body in ["[]", '"x"', "3", "{not json", '{"token": ""}']:
+            response = await client.post("/offer", data=body)
+            assert response.status == 400, body
+
+
+@pytest.mark.asyncio
+async def test_offers_to_one_robot_are_spaced(monkeypatch):
+    started = {}
+
+    async def answer(sdp_offer, token, ip):
+        started.setdefault(ip, []).append(time.monotonic())
+        await asyncio.sleep(0.01)
+        return {"sdp": "v=0 answer", "type": "answer"}
+
+    monkeypatch.setattr(Go2Connection, "get_peer_answer_async", staticmethod(answer))
+    async with serve(interval=0.2) as client:
+        offers = [client.post("/offer", json=offer_body("192.168.12.1")) for _ in range(3)]
+        offers.append(client.post("/offer", json=offer_body("192.168.12.2")))
+        responses = await asyncio.gather(*offers)
+        assert [response.status for response in responses] == [200] * 4
+        assert await responses[0].json() == {"sdp": "v=0 answer", "type": "answer"}
+
+        metrics = await (await client.get("/metrics")).json()
+
+    first = started["192.168.12.1"]
+    assert all(later - earlier >= 0.19 for earlier, later in zip(first, first[1:]))
+    # Another robot is not held up by the first one
+    assert started["192.168.12.2"][0] - first[0] < 0.1
+
+    robot = metrics["192.168.12.1"]
+    assert robot["ok"] == 3 and robot["failed"] == 0 and robot["in_flight"] == 0
+    assert robot["queued"]["count"] == robot["exchange"]["count"] == 3
+    # The last offer waited for the two before it
+    assert robot["queued"]["max_ms"] >= 350
+    assert metrics["192.168.12.2"]["ok"] == 1
+
+
+@pytest.mark.asyncio
+async def test_failed_exchanges_are_counted(monkeypatch):
+    async def refuse(sdp_offer, token, ip):
+        raise ValueError("Failed to get answer from server")
+
+    monkeypatch.setattr(Go2Connection, "get_peer_answer_async", staticmethod(refuse))
+    async with serve() as client:
+        response = await client.post("/offer", json=offer_body("192.168.12.1"))
+        assert response.status == 502
+        metrics = await (await client.get("/metrics")).json()
+    assert metrics["192.168.12.1"]["failed"] == 1
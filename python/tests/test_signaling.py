@@ -0,0 +1,100 @@
+import asyncio
+import base64
+import json
+
+import pytest
+from aiohttp import web
+from Crypto.Cipher import PKCS1_v1_5
+from Crypto.PublicKey import RSA
+
+from go2_webrtc.go2_connection import Go2Connection, close_session, get_session
+
+
+class Offer:
+    sdp = "v=0 offer"
+    type = "offer"
+
+
+@pytest.fixture(scope="module")
+def robot_key():
+    return RSA.generate(2048)
+
+
+async def start_fake_robot(robot_key, rate_limited=1):
+    """Serve the con_notify/con_ing exchange like the robot's port 9991."""
+    data1 = "x" * 10 + "robot-data" + "AABBCCDDEE"
+    ending = Go2Connection.calc_local_path_ending(data1)
+    public_key = base64.b64encode(robot_key.publickey().export_key("DER")).decode()
+    calls = {"notify": 0}
+
+    async def con_notify(request):
+        calls["notify"] += 1
+        if calls["notify"] <= rate_limited:
+            return web.Response(status=429, headers={"Retry-After": "0"})
+        payload = json.dumps({"data1": data1, "data2": public_key})
+        return web.Response(text=base64.b64encode(payload.encode()).decode())
+
+    async def con_ing(request):
+        body = json.loads(await request.text())
+        cipher = PKCS1_v1_5.new(robot_key)
+        aes_key = cipher.decrypt(base64.b64decode(body["data2"]), None).decode()
+        offer = json.loads(Go2Connection.aes_decrypt(body["data1"], aes_key))
+        answer = {"sdp": offer["sdp"].replace("offer", "answer"), "type": "answer"}
+        return web.Response(text=Go2Connection.aes_encrypt(json.dumps(answer), aes_key))
+
+    app = web.Application()
+    app.router.add_post("/con_notify", con_notify)
+    app.router.add_post(f"/con_ing_{ending}", con_ing)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    return runner, port
+
+
+@pytest.mark.asyncio
+async def test_async_peer_answer_does_not_block_the_loop(robot_key):
+    runner, port = await start_fake_robot(robot_key)
+    ticks = 0
+
+    async def ticker():
+        nonlocal ticks
+        while True:
+            await asyncio.sleep(0.005)
+            ticks += 1
+
+    task = asyncio.ensure_future(ticker())
+    try:
+        answer = await Go2Connection.get_peer_answer_async(
+            Offer(), "token", "127.0.0.1", pause=0.1, port=port
+        )
+    finally:
+        task.cancel()
+        await close_session()
+        await runner.cleanup()
+
+    assert answer == {"sdp": "v=0 answer", "type": "answer"}
+    # The loop kept running through the 429 retry and the pause
+    assert ticks >= 10
+
+
+def test_session_left_on_another_loop_is_closed():
+    async def open_session():
+        return get_session()
+
+    async def open_and_close_session():
+        current = get_session()
+        await close_session()
+        return current
+
+    first_loop = asyncio.new_event_loop()
+    try:
+        first = first_loop.run_until_complete(open_session())
+        second = asyncio.run(open_and_close_session())
+    finally:
+        first_loop.close()
+
+    assert second is not first
+    assert first.closed
+    assert second.closed
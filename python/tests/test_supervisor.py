@@ -0,0 +1,112 @@
+import asyncio
+import json
+
+import pytest
+from aiortc import RTCPeerConnection
+
+from go2_webrtc.go2_connection import Go2Connection
+from go2_webrtc.supervisor import ConnectionSupervisor
+
+
+class FakeRobot:
+    """Answers offers over loopback and validates every data channel."""
+
+    def __init__(self):
+        self.peers = []
+        self.received = []
+        self.warm_offers = 0
+
+    async def answer(self, conn):
+        if conn.pc.localDescription is not None:
+            self.warm_offers += 1
+        else:
+            await conn.generate_offer()
+        peer = RTCPeerConnection()
+        self.peers.append(peer)
+        received = []
+        self.received.append(received)
+
+        @peer.on("datachannel")
+        def on_datachannel(channel):
+            channel.on("message", lambda message: received.append(json.loads(message)))
+            channel.send(json.dumps({"type": "validation", "data": "Validation Ok."}))
+
+        await peer.setRemoteDescription(conn.pc.localDescription)
+        await peer.setLocalDescription(await peer.createAnswer())
+        await conn.set_answer(peer.localDescription.sdp)
+
+    async def close(self):
+        for peer in self.peers:
+            await peer.close()
+
+
+async def wait_for(condition, timeout=10.0):
+    async def poll():
+        while not condition():
+            await asyncio.sleep(0.02)
+
+    await asyncio.wait_for(poll(), timeout)
+
+
+@pytest.mark.asyncio
+async def test_reconnects_and_restores_subscriptions(monkeypatch):
+    robot = FakeRobot()
+    monkeypatch.setattr(Go2Connection, "connect_robot_v10", lambda conn: robot.answer(conn))
+    validated = []
+    supervisor = ConnectionSupervisor(backoff=0.01, on_validated=lambda: validated.append(True))
+    supervisor.subscribe("rt/lf/lowstate")
+    supervisor.start()
+    try:
+        await asyncio.wait_for(supervisor.connected.wait(), 10)
+        first = supervisor.conn
+        await wait_for(lambda: robot.received[0])
+        assert robot.received[0] == [{"type": "subscribe", "topic": "rt/lf/lowstate"}]
+        # Made on the connection itself, not through the supervisor
+        first.subscribe("rt/multiplestate")
+
+        # The robot side going away closes the link
+        await robot.peers[0].close()
+        await wait_for(lambda: supervisor.conn not in (None, first))
+        await wait_for(lambda: len(robot.received[1]) == 2)
+        assert robot.received[1] == [
+            {"type": "subscribe", "topic": "rt/lf/lowstate"},
+            {"type": "subscribe", "topic": "rt/multiplestate"},
+        ]
+        assert supervisor.reconnects == 1
+        assert supervisor.last_recovery is not None
+        assert validated == [True, True]
+        # Both connections were signaled with an offer generated in advance
+        assert robot.warm_offers == 2
+    finally:
+        await supervisor.stop()
+        await robot.close()
+
+
+@pytest.mark.asyncio
+async def test_failed_attempts_back_off(monkeypatch):
+    attempts = []
+
+    async def refuse(conn):
+        attempts.append(asyncio.get_running_loop().time())
+        raise ValueError("Failed to get answer from server")
+
+    monkeypatch.setattr(Go2Connection, "connect_robot_v10", refuse)
+    supervisor = ConnectionSupervisor(backoff=0.05, max_backoff=0.1)
+    supervisor.start()
+    try:
+        await wait_for(lambda: len(attempts) >= 4)
+    finally:
+        await supervisor.stop()
+
+    gaps = [b - a for a, b in zip(attempts, attempts[1:])]
+    assert all(gap >= 0.02 for gap in gaps)
+    assert supervisor.conn is None
+
+
+def test_backoff_is_jittered_and_capped():
+    supervisor = ConnectionSupervisor(backoff=1.0, max_backoff=4.0)
+    delays = [supervisor.delay(attempt) for attempt in (1, 2, 3, 10)]
+    assert 0.5 <= delays[0] <= 1.0
+    assert 1.0 <= delays[1] <= 2.0
+    assert 2.0 <= delays[2] <= 4.0
+    assert 2.0 <= delays[3] <= 4.0
@@ -0,0 +1,100 @@
+import asyncio
+
+import numpy as np
+import pytest
+from aiortc import RTCPeerConnection, VideoStreamTrack
+from aiortc.mediastreams import MediaStreamError
+from av import VideoFrame
+
+from go2_webrtc.go2_connection import Go2Connection
+from go2_webrtc.video import VideoConsumer, frame_to_ndarray
+
+
+def solid_frame(width, height, color):
+    data = np.zeros((height, width, 3), np.uint8)
+    data[:, :] = color
+    return VideoFrame.from_ndarray(data, format="bgr24")
+
+
+class ColorTrack(VideoStreamTrack):
+    async def recv(self):
+        pts, time_base = await self.next_timestamp()
+        frame = solid_frame(320, 240, (0, 128, 255))
+        frame.pts = pts
+        frame.time_base = time_base
+        return frame
+
+
+class BurstTrack:
+    """Hands out `count` frames as fast as they are asked for."""
+
+    kind = "video"
+
+    def __init__(self, count):
+        self.frames = [solid_frame(64, 48, (i, i, i)) for i in range(count)]
+
+    async def recv(self):
+        if not self.frames:
+            raise MediaStreamError
+        frame = self.frames.pop(0)
+        frame.pts = 255 - len(self.frames)
+        return frame
+
+
+def test_ndarray_is_a_view_of_the_frame():
+    # An odd width gives padded rows
+    frame = solid_frame(63, 7, (1, 2, 3)).reformat(format="yuv420p").reformat(format="bgr24")
+    array = frame_to_ndarray(frame)
+    assert array.shape == (7, 63, 3)
+    assert np.shares_memory(array, np.frombuffer(frame.planes[0], np.uint8))
+    assert np.array_equal(array, frame.to_ndarray(format="bgr24"))
+
+    assert frame_to_ndarray(frame, "gray").shape == (7, 63)
+
+
+@pytest.mark.asyncio
+async def test_slow_conversion_skips_to_the_latest_frame():
+    consumer = VideoConsumer()
+    await consumer.start(BurstTrack(50))
+
+    assert consumer.received == 50
+    assert consumer.converted + consumer.dropped == 50
+    assert consumer.dropped > 0
+    # The last frame is always converted
+    assert consumer.pts == 255
+    assert consumer.latest()[0, 0, 0] == 49
+    assert consumer.stats()["latency"]["count"] == consumer.converted
+
+
+@pytest.mark.asyncio
+async def test_receives_video_from_an_aiortc_sender():
+    consumer = VideoConsumer()
+    conn = Go2Connection(video=consumer)
+    sender = RTCPeerConnection()
+    try:
+        await conn.generate_offer()
+        await sender.setRemoteDescription(conn.pc.localDescription)
+        sender.addTrack(ColorTrack())
+        await sender.setLocalDescription(await sender.createAnswer())
+        await conn.set_answer(sender.localDescription.sdp)
+
+        frames = []
+
+        async def take(count):
+            async for frame in consumer.frames():
+                frames.append(frame)
+                if len(frames) == count:
+                    return
+
+        while consumer.task is None:
+            await asyncio.sleep(0.01)
+        await asyncio.wait_for(take(3), 20)
+    finally:
+        await conn.close()
+        await sender.close()
+
+    assert frames[-1].shape == (240, 320, 3)
+    # Lossy coding keeps the color roughly
+    assert np.allclose(frames[-1].reshape(-1, 3).mean(axis=0), (0, 128, 255), atol=12)
+    assert consumer.converted >= 3
+    assert consumer.ended
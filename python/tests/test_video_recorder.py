@@ -0,0 +1,128 @@
+import asyncio
+import fractions
+import queue
+import types
+
+import av
+import numpy as np
+import pytest
+from aiortc import RTCPeerConnection, RTCRtpSender
+
+from go2_webrtc.go2_connection import Go2Connection
+from go2_webrtc.video_recorder import VideoSegmentRecorder, is_keyframe
+from test_video import ColorTrack
+
+
+H264 = types.SimpleNamespace(name="H264")
+
+
+def encoded_frames(count, gop):
+    encoder = av.CodecContext.create("libx264", "w")
+    encoder.width, encoder.height, encoder.pix_fmt = 160, 120, "yuv420p"
+    encoder.time_base = fractions.Fraction(1, 90000)
+    encoder.gop_size = gop
+    encoder.options = {"tune": "zerolatency", "bf": "0"}
+    frames = []
+    for i in range(count):
+        image = np.full((120, 160, 3), i * 4 % 256, np.uint8)
+        frame = av.VideoFrame.from_ndarray(image, format="bgr24").reformat(format="yuv420p")
+        frame.pts = i * 3000
+        frames += [bytes(packet) for packet in encoder.encode(frame)]
+    return frames
+
+
+def decoded_count(path):
+    with av.open(path) as container:
+        return sum(1 for _ in container.decode(video=0))
+
+
+def test_segments_start_at_keyframes(tmp_path):
+    frames = encoded_frames(40, gop=10)
+    assert [i for i, data in enumerate(frames) if is_keyframe("h264", data)] == [0, 10, 20, 30]
+
+    recorder = VideoSegmentRecorder(tmp_path, segment_duration=0.5)
+    # Joining mid-stream, the frames before the next keyframe are skipped
+    for i, data in enumerate(frames[5:], 5):
+        recorder.put(H264, types.SimpleNamespace(data=data, timestamp=i * 3000))
+    recorder.close()
+
+    assert recorder.skipped == 5
+    assert recorder.recorded == 30
+    assert [path.rsplit("/", 1)[1] for path in recorder.segments] == [
+        "segment-00000.ts",
+        "segment-00001.ts",
+    ]
+    # 0.5s at 30 fps is 15 frames, the next keyframe is at frame 30
+    assert [decoded_count(path) for path in recorder.segments] == [20, 10]
+
+
+def test_segments_rotate_by_size(tmp_path):
+    frames = encoded_frames(40, gop=10)
+    recorder = VideoSegmentRecorder(tmp_path, segment_duration=None, segment_size=1)
+    for i, data in enumerate(frames):
+        recorder.put(H264, types.SimpleNamespace(data=data, timestamp=i * 3000))
+    recorder.close()
+    assert [decoded_count(path) for path in recorder.segments] == [10, 10, 10, 10]
+
+
+def fake_receiver():
+    receiver = types.SimpleNamespace()
+    receiver._RTCRtpReceiver__decoder_queue = queue.Queue()
+    return receiver
+
+
+def test_new_track_starts_a_new_segment(tmp_path):
+    frames = encoded_frames(20, gop=10)
+    recorder = VideoSegmentRecorder(tmp_path)
+    for _ in range(2):
+        receiver = fake_receiver()
+        recorder.attach(receiver, decode=False)
+        # Timestamps restart with every track
+        decoder_queue = receiver._RTCRtpReceiver__decoder_queue
+        for i, data in enumerate(frames):
+            decoder_queue.put((H264, types.SimpleNamespace(data=data, timestamp=i * 3000)))
+        assert decoder_queue.empty()
+    recorder.close()
+    assert [decoded_count(path) for path in recorder.segments] == [20, 20]
+
+
+def test_attach_does_not_block_on_a_full_queue(tmp_path):
+    recorder = VideoSegmentRecorder(tmp_path, max_pending=2)
+    recorder.close()
+    recorder.put(H264, types.SimpleNamespace(data=b"", timestamp=0))
+    recorder.put(H264, types.SimpleNamespace(data=b"", timestamp=1))
+    recorder.attach(fake_receiver())
+    recorder.put(H264, types.SimpleNamespace(data=b"", timestamp=2))
+    assert recorder.dropped == 1
+    # Still waiting for a frame to mark the start of the track with
+    assert recorder.new_track
+
+
+@pytest.mark.asyncio
+async def test_records_video_from_an_aiortc_sender(tmp_path):
+    recorder = VideoSegmentRecorder(tmp_path)
+    conn = Go2Connection(video_recorder=recorder)
+    transceiver = conn.pc.getTransceivers()[0]
+    transceiver.setCodecPreferences(
+        [c for c in RTCRtpSender.getCapabilities("video").codecs if c.name == "H264"]
+    )
+    sender = RTCPeerConnection()
+    try:
+        await conn.generate_offer()
+        await sender.setRemoteDescription(conn.pc.localDescription)
+        sender.addTrack(ColorTrack())
+        await sender.setLocalDescription(await sender.createAnswer())
+        await conn.set_answer(sender.localDescription.sdp)
+
+        async def recorded(count):
+            while recorder.recorded < count:
+                await asyncio.sleep(0.05)
+
+        await asyncio.wait_for(recorded(10), 20)
+    finally:
+        await conn.close()
+        await sender.close()
+        recorder.close()
+
+    assert recorder.segments[0].endswith(".ts")
+    assert decoded_count(recorder.segments[0]) >= 10
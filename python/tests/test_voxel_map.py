@@ -0,0 +1,72 @@
+import numpy as np
+
+from go2_webrtc.voxel_map import VoxelMap
+
+
+def cube(offset, size=3, resolution=0.1):
+    grid = np.stack(np.meshgrid(*[np.arange(size)] * 3, indexing="ij"), axis=-1)
+    return (grid.reshape(-1, 3) + 0.5 + np.asarray(offset)) * resolution
+
+
+def test_integrate_only_touches_changed_cells():
+    voxel_map = VoxelMap(resolution=0.1)
+    assert voxel_map.integrate(cube([0, 0, 0]), stamp=0.0) == (27, 0)
+    assert voxel_map.integrate(cube([1, 0, 0]), stamp=1.0) == (9, 9)
+    # Cells that left the view are kept until they expire
+    assert len(voxel_map) == 36
+    np.testing.assert_allclose(
+        voxel_map.occupied()[:, 0].min(), 0.05, atol=1e-6
+    )
+
+
+def test_stale_cells_expire_and_live_cells_survive():
+    voxel_map = VoxelMap(resolution=0.1, ttl=5.0)
+    voxel_map.integrate(cube([0, 0, 0]), stamp=0.0)
+    voxel_map.integrate(cube([0, 0, 0], size=2), stamp=1.0)
+    assert len(voxel_map) == 27
+    voxel_map.integrate(cube([0, 0, 0], size=2), stamp=10.0)
+    assert len(voxel_map) == 8
+
+
+def test_memory_budget_is_enforced():
+    voxel_map = VoxelMap(resolution=0.1, max_cells=20)
+    voxel_map.integrate(cube([0, 0, 0]), stamp=0.0)
+    assert len(voxel_map) == 20
+
+
+def test_budget_evicts_stale_cells_before_observed_ones():
+    voxel_map = VoxelMap(resolution=1, max_cells=10, ttl=100)
+    for frame in range(20):
+        # One static cell in view throughout, one moving cell
+        voxel_map.integrate([[0.5, 0.5, 0.5], [frame + 1.5, 5.5, 0.5]], stamp=float(frame))
+
+    cells = {tuple(cell) for cell in voxel_map.occupied().tolist()}
+    assert len(cells) == 10
+    assert (0.5, 0.5, 0.5) in cells
+    assert (20.5, 5.5, 0.5) in cells
+
+
+def test_evicted_observed_cells_come_back_when_seen():
+    voxel_map = VoxelMap(resolution=0.1, max_cells=20)
+    assert voxel_map.integrate(cube([0, 0, 0]), stamp=0.0) == (27, 0)
+    # The 7 cells evicted from the still visible cube are added again
+    assert voxel_map.integrate(cube([0, 0, 0]), stamp=1.0) == (7, 0)
+    assert len(voxel_map) == 20
+
+
+def test_sensor_frame_points_follow_robot_pose():
+    voxel_map = VoxelMap(resolution=0.1, sensor_frame=True)
+    # Rotated 90 degrees about z and moved 1 m along x
+    voxel_map.update(
+        {
+            "topic": "rt/utlidar/robot_pose",
+            "data": {
+                "pose": {
+                    "position": {"x": 1.0, "y": 0.0, "z": 0.0},
+                    "orientation": {"x": 0.0, "y": 0.0, "z": np.sqrt(0.5), "w": np.sqrt(0.5)},
+                }
+            },
+        }
+    )
+    voxel_map.integrate([[0.55, 0.05, 0.05]], stamp=0.0)
+    np.testing.assert_allclose(voxel_map.occupied(), [[0.95, 0.55, 0.05]], atol=1e-6)